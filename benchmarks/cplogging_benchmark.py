@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+# Info
+# Measures the cost of one Cplogging call, each with the former
+# inspect.stack() based lookup for comparison:
+#   disabled - logged below the configured log-level, so only the work done
+#              before the logging module drops the record is measured
+#   enabled  - logged at the configured log-level, so the lookup of the
+#              caller's logger and the formatting by the JSON-formatter are
+#              measured. The log-queue is disabled, so the record is formatted
+#              by the calling thread, and written to /dev/null
+
+# Usage
+# run from the root of the repository:
+#     python benchmarks/cplogging_benchmark.py [number_of_calls]
+
+import inspect
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import lib.settings
+lib.settings.global_log_level = "info"
+lib.settings.global_log_file_path = "disabled"
+lib.settings.global_log_server_enable = False
+lib.settings.global_log_queue_enable = False
+from lib.cplogging import Cplogging
+
+
+class InspectStackCplogging(Cplogging):
+    # the lookup as it was done before - only used for the comparison
+    def debug(self, msg):
+        stack = inspect.stack()
+        try:
+            logger_name = stack[1][0].f_locals['logger_name']
+        except KeyError:
+            logger_name = self.logger_name
+        logger = logging.getLogger(logger_name)
+        logger.debug(msg)
+
+    def info(self, msg):
+        stack = inspect.stack()
+        try:
+            logger_name = stack[1][0].f_locals['logger_name']
+        except KeyError:
+            logger_name = self.logger_name
+        logger = logging.getLogger(logger_name)
+        logger.info(msg)
+
+
+def measure(logger, number, enabled=False):
+    def disabled_call():
+        # a caller with its own logger_name - like every function of kube-vip-watcher.py
+        logger_name = "benchmark"
+        logger.debug("benchmark %s" % logger_name)
+    # enddef
+
+    def enabled_call():
+        logger_name = "benchmark"
+        logger.info("benchmark %s" % logger_name)
+    # enddef
+
+    call = enabled_call if enabled else disabled_call
+    return min(timeit.repeat(call, number=number, repeat=5)) / number
+# enddef
+
+
+def discard_output(logger_name):
+    # the handlers installed by Cplogging still format every record, but write it to /dev/null instead of stderr
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger(logger_name).handlers:
+        handler.setStream(devnull)
+    # endfor
+# enddef
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    logger_name = "benchmark"
+    current_logger = Cplogging(logger_name)
+    discard_output(logger_name)
+    former_logger = InspectStackCplogging(logger_name)
+    for level, enabled in (("disabled", False), ("enabled", True)):
+        current = measure(current_logger, number, enabled)
+        former = measure(former_logger, number, enabled)
+        print("%s level:" % level)
+        print("  inspect.stack(): %10.2f us per call" % (former * 1e6))
+        print("  sys._getframe(): %10.2f us per call" % (current * 1e6))
+        print("  speedup:         %10.1fx" % (former / current))
+    # endfor
+# enddef
+
+
+if __name__ == '__main__':
+    main()
+# endif
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+# Info
+# Compares the two ways the pod store can be fed:
+#   model - like kubernetes.watch.Watch: the event is parsed, dumped and parsed
+#           again into a V1Pod, which is then reduced to a PodDescriptor
+#   slim  - the event is only parsed as JSON and decode_pod_descriptor() picks
+#           the needed fields (global_watch_pods_slim = True)
+# Reported are the CPU time per watch event and the peak RSS of a process which
+# lists the given number of pods (each mode runs in a process of its own).
+
+# Usage
+# run from the root of the repository:
+#     python benchmarks/pod_decode_benchmark.py [number_of_pods]
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from kubernetes import client
+from lib.informer import json_loads
+from lib.records import parse_pod_descriptor, decode_pod_descriptor
+
+
+def make_pod(i):
+    # about the size of a real pod with one container - managedFields and the like make up most of it
+    name = "logstash-buffer-%d" % i
+    return {
+        "metadata": {
+            "name": name, "namespace": "logging", "uid": "0c7bd2f6-6a1e-4c55-9d6e-%012d" % i, "resourceVersion": str(100000 + i),
+            "creationTimestamp": "2026-10-17T10:00:00Z", "generateName": "logstash-buffer-",
+            "labels": {"app": "logstash-buffer", "controller-revision-hash": "logstash-buffer-6c9f8d7b5", "statefulset.kubernetes.io/pod-name": name},
+            "annotations": {"kubeVipBalanceIP": "true", "kubectl.kubernetes.io/restartedAt": "2026-10-17T09:59:00Z"},
+            "ownerReferences": [{"apiVersion": "apps/v1", "kind": "StatefulSet", "name": "logstash-buffer", "uid": "a8a0b9d2-1f5e-4f0b-9a55-3c7e8d2f1b11", "controller": True, "blockOwnerDeletion": True}],
+            "managedFields": [
+                {"manager": "kube-controller-manager", "operation": "Update", "apiVersion": "v1", "time": "2026-10-17T10:00:00Z", "fieldsType": "FieldsV1",
+                 "fieldsV1": {"f:metadata": {"f:generateName": {}, "f:labels": {".": {}, "f:app": {}}, "f:ownerReferences": {}}, "f:spec": {"f:containers": {}, "f:volumes": {}}}},
+                {"manager": "kubelet", "operation": "Update", "apiVersion": "v1", "time": "2026-10-17T10:00:05Z", "fieldsType": "FieldsV1", "subresource": "status",
+                 "fieldsV1": {"f:status": {"f:conditions": {}, "f:containerStatuses": {}, "f:hostIP": {}, "f:phase": {}, "f:podIP": {}, "f:startTime": {}}}},
+            ],
+        },
+        "spec": {
+            "nodeName": "vkube-%d" % (4 + i % 3), "restartPolicy": "Always", "terminationGracePeriodSeconds": 30, "dnsPolicy": "ClusterFirst",
+            "serviceAccountName": "default", "schedulerName": "default-scheduler", "hostname": name, "subdomain": "logstash-buffer",
+            "containers": [{
+                "name": "logstash", "image": "docker.elastic.co/logstash/logstash:8.15.0", "imagePullPolicy": "IfNotPresent",
+                "ports": [{"containerPort": 5044, "protocol": "TCP"}, {"containerPort": 9600, "protocol": "TCP"}],
+                "env": [{"name": "LS_JAVA_OPTS", "value": "-Xms1g -Xmx1g"}, {"name": "PIPELINE_WORKERS", "value": "4"}],
+                "resources": {"limits": {"cpu": "2", "memory": "2Gi"}, "requests": {"cpu": "500m", "memory": "1Gi"}},
+                "volumeMounts": [{"name": "data", "mountPath": "/usr/share/logstash/data"}, {"name": "config", "mountPath": "/usr/share/logstash/pipeline"},
+                                 {"name": "kube-api-access", "mountPath": "/var/run/secrets/kubernetes.io/serviceaccount", "readOnly": True}],
+                "readinessProbe": {"httpGet": {"path": "/", "port": 9600, "scheme": "HTTP"}, "periodSeconds": 10, "timeoutSeconds": 1, "successThreshold": 1, "failureThreshold": 3},
+                "terminationMessagePath": "/dev/termination-log", "terminationMessagePolicy": "File",
+            }],
+            "volumes": [{"name": "data", "persistentVolumeClaim": {"claimName": "data-" + name}}, {"name": "config", "configMap": {"name": "logstash-pipeline", "defaultMode": 420}},
+                        {"name": "kube-api-access", "projected": {"defaultMode": 420, "sources": [{"serviceAccountToken": {"expirationSeconds": 3607, "path": "token"}}]}}],
+            "tolerations": [{"key": "node.kubernetes.io/not-ready", "operator": "Exists", "effect": "NoExecute", "tolerationSeconds": 300},
+                            {"key": "node.kubernetes.io/unreachable", "operator": "Exists", "effect": "NoExecute", "tolerationSeconds": 300}],
+        },
+        "status": {
+            "phase": "Running", "hostIP": "10.0.0.%d" % (4 + i % 3), "podIP": "10.244.%d.%d" % (i // 250, i % 250), "qosClass": "Burstable", "startTime": "2026-10-17T10:00:00Z",
+            "conditions": [{"type": condition, "status": "True", "lastTransitionTime": "2026-10-17T10:00:05Z"} for condition in ("Initialized", "Ready", "ContainersReady", "PodScheduled")],
+            "containerStatuses": [{"name": "logstash", "ready": True, "started": True, "restartCount": 0, "image": "docker.elastic.co/logstash/logstash:8.15.0",
+                                   "imageID": "docker.elastic.co/logstash/logstash@sha256:" + "0" * 64, "containerID": "containerd://" + "%064d" % i,
+                                   "state": {"running": {"startedAt": "2026-10-17T10:00:03Z"}}}],
+        },
+    }
+# enddef
+
+
+def decode_model(api_client, line):
+    # what kubernetes.watch.Watch.unmarshal_event does, plus the reduction to a PodDescriptor
+    event = json.loads(line)
+    pod = api_client.deserialize(json.dumps(event['object']), "V1Pod", "application/json")
+    return parse_pod_descriptor(pod)
+# enddef
+
+
+def decode_slim(line):
+    return decode_pod_descriptor(json_loads(line)['object'])
+# enddef
+
+
+def cpu_per_event(number):
+    api_client = client.ApiClient()
+    lines = [json.dumps({"type": "MODIFIED", "object": make_pod(i)}) for i in range(number)]
+    results = {}
+    for mode, func in (("model", lambda line: decode_model(api_client, line)), ("slim", decode_slim)):
+        started = time.process_time()
+        for line in lines:
+            func(line)
+        # endfor
+        results[mode] = (time.process_time() - started) / number
+    # endfor
+    return results, len(lines[0])
+# enddef
+
+
+def list_pods(mode, number):
+    # runs in a process of its own - like Informer._list() followed by filling the store
+    body = json.dumps({"metadata": {"resourceVersion": "100000"}, "items": [make_pod(i) for i in range(number)]}).encode()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if mode == "model":
+        pod_list = client.ApiClient().deserialize(body.decode(), "V1PodList", "application/json")
+        store = dict(("%s/%s" % (pod.metadata.namespace, pod.metadata.name), parse_pod_descriptor(pod)) for pod in pod_list.items)
+    else:
+        pod_list = json_loads(body)
+        store = dict(("%s/%s" % (pod.namespace, pod.name), pod) for pod in (decode_pod_descriptor(item) for item in pod_list["items"]))
+    # endif
+    del pod_list
+    # ru_maxrss is in KiB on Linux
+    print((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) // 1024, len(store))
+# enddef
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] in ("model", "slim"):
+        list_pods(sys.argv[1], int(sys.argv[2]))
+        return
+    # endif
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    results, event_size = cpu_per_event(number)
+    print("%d watch events of %d bytes each" % (number, event_size))
+    print("model (V1Pod):     %10.1f us CPU per event" % (results["model"] * 1e6))
+    print("slim (raw JSON):   %10.1f us CPU per event" % (results["slim"] * 1e6))
+    print("speedup:           %10.1fx" % (results["model"] / results["slim"]))
+    for mode in ("model", "slim"):
+        output = subprocess.check_output([sys.executable, os.path.abspath(__file__), mode, str(number)]).decode().split()
+        print("%-18s %10s MiB peak RSS while listing %s pods" % (mode + ":", output[0], output[1]))
+    # endfor
+# enddef
+
+
+if __name__ == '__main__':
+    main()
+# endif
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+# Info
+# Measures the memory the pod store holds per pod (store entry, key and index
+# entry included) for the ways a pod can be kept:
+#   model      - the full V1Pod as returned by the kubernetes-client
+#   namedtuple - the reduced pod as a namedtuple without interning (v0.11)
+#   record     - the PodDescriptor with __slots__ and interned values (v0.12)
+# Only the memory still allocated after the JSON of each pod was dropped is
+# counted (tracemalloc), so it is what a long-running watcher keeps.
+
+# Usage
+# run from the root of the repository:
+#     python benchmarks/records_benchmark.py [number_of_pods]
+
+import collections
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from kubernetes import client
+from lib.informer import Informer, json_loads
+from lib.records import decode_pod_descriptor
+from pod_decode_benchmark import make_pod
+
+PodTuple = collections.namedtuple("PodTuple", ["namespace", "name", "resource_version", "app", "balance_ip", "node_name", "phase", "containers_ready"])
+
+
+def decode_pod_tuple(pod):
+    # like decode_pod_descriptor(), but every value is a string of its own
+    metadata = pod['metadata']
+    status = pod.get('status') or {}
+    container_statuses = status.get('containerStatuses')
+    return PodTuple(
+        namespace=metadata.get('namespace'),
+        name=metadata['name'],
+        resource_version=metadata.get('resourceVersion'),
+        app=(metadata.get('labels') or {}).get('app'),
+        balance_ip=(metadata.get('annotations') or {}).get('kubeVipBalanceIP'),
+        node_name=(pod.get('spec') or {}).get('nodeName'),
+        phase=status.get('phase'),
+        containers_ready=container_statuses is not None and all(container_status.get('ready') for container_status in container_statuses),
+    )
+# enddef
+
+
+def index_pod_by_app_and_node(pod):
+    if isinstance(pod, client.V1Pod):
+        return [(pod.metadata.namespace, (pod.metadata.labels or {}).get('app'), pod.spec.node_name)]
+    # endif
+    return [(pod.namespace, pod.app, pod.node_name)] if pod.app is not None else []
+# enddef
+
+
+def bytes_per_pod(mode, lines):
+    api_client = client.ApiClient()
+    decoders = {
+        "model": lambda line: api_client.deserialize(line, "V1Pod", "application/json"),
+        "namedtuple": lambda line: decode_pod_tuple(json_loads(line)),
+        "record": lambda line: decode_pod_descriptor(json_loads(line)),
+    }
+    decode = decoders[mode]
+    informer = Informer("pods", None, indexers={"app_node": index_pod_by_app_and_node})
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for line in lines:
+        pod = decode(line)
+        informer._store(informer.key(pod), pod)
+    # endfor
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / len(lines)
+# enddef
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    # every pod as a string of its own - like it is read from the Kubernetes-API
+    lines = [json.dumps(make_pod(i)) for i in range(number)]
+    print("%d pods of %d bytes JSON each" % (number, len(lines[0])))
+    for mode in ("model", "namedtuple", "record"):
+        print("%-12s %10.0f bytes per pod" % (mode + ":", bytes_per_pod(mode, lines)))
+    # endfor
+# enddef
+
+
+if __name__ == '__main__':
+    main()
+# endif
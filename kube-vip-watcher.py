@@ -14,12 +14,25 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import sys
 import time
-import random
+import socket
+import threading
+import concurrent.futures
+import contextvars
 import lib.settings
 from lib.cplogging import Cplogging
-from kubernetes import client, config, watch
+from lib.informer import Informer
+from lib.records import ServiceDescriptor, intern_tuple, parse_pod_descriptor, decode_pod_descriptor, parse_node_descriptor, parse_lease_descriptor
+from lib.workqueue import WorkQueue
+from lib.kubeapi import CountingApi, new_api_client
+from lib.httpserver import HttpServer
+from lib.leaderelection import LeaderElector
+from lib.sharding import ShardMembership
+from lib.backoff import Backoff, CircuitBreaker
+from lib import metrics
+from kubernetes import client, config
 
 
 # OVERRIDE GLOBAL SETTINGS from lib/settings.py
@@ -42,93 +55,360 @@ from kubernetes import client, config, watch
 # for loading config if script is running as pod/container
 config.load_incluster_config()
 
-v1_core = client.CoreV1Api()
-v1_coordination = client.CoordinationV1Api()
+# every call is counted by verb and resource in the metrics and gets a timeout by its class - a hung connection fails and
+# is retried instead of blocking a worker (or a failover) forever. Both APIs share one connection pool - it grows by the
+# connections the namespace watches of pods, services and leases may hold at most
+api_client = new_api_client(lib.settings.global_api_connection_pool_size + 3 * lib.settings.global_watch_max_namespace_watches, lib.settings.global_api_tcp_keepalive)
+api_timeouts = {
+    "read": (lib.settings.global_api_connect_timeout_seconds, lib.settings.global_api_read_timeout_seconds),
+    "list": (lib.settings.global_api_connect_timeout_seconds, lib.settings.global_api_list_timeout_seconds),
+    "watch": (lib.settings.global_api_connect_timeout_seconds, lib.settings.global_api_watch_read_timeout_seconds),
+    "write": (lib.settings.global_api_connect_timeout_seconds, lib.settings.global_api_write_timeout_seconds),
+}
+v1_core = CountingApi(client.CoreV1Api(api_client), timeouts=api_timeouts, retries=lib.settings.global_api_retries)
+v1_coordination = CountingApi(client.CoordinationV1Api(api_client), timeouts=api_timeouts, retries=lib.settings.global_api_retries)
 
-w = watch.Watch()
 
-def check_node_state(node_name):
-    logger_name = "check_node_state"
+def parse_service_descriptor(service):
+    logger_name = "parse_service_descriptor"
     logger = Cplogging(logger_name)
-    try:
-        node_status = v1_core.read_node_status(node_name)
-        node_conditions = node_status.status.conditions
-    except Exception as e:
-        logger.error("Exception when calling CoreV1Api->read_node_status: %s\n" % e)
-        node_conditions = []
-    # endtry
+    service_name = service.metadata.name
+    labels = service.metadata.labels or {}
+    annotations = service.metadata.annotations or {}
     
-    for condition in node_conditions:
-        logger.debug("Node %s condition: %s" % (node_name, str(condition).replace("\n", "")))  # ouput in single line which may be easier to be parsed by log-pattern analyzers
-        # logger.debug("Node %s condition: %s" % (node_name, condition))  # tried with "pretty=False" but somehow it's still "pretty-printed"
-        # we check for type "Ready" and look at the status
-        if condition.type == "Ready":
-            if condition.status == "True":
-                logger.info("Node %s marked as 'Ready'" % node_name)
-                return True
+    balance_priority_order = None
+    if 'kubeVipBalancePriority' in annotations:
+        # remove whitespaces for each element in the list
+        balance_priority_order = intern_tuple(node.strip() for node in str(annotations['kubeVipBalancePriority']).split(",") if node.strip())
+    # endif
+    # all services of the cluster are parsed - only the ones we balance are worth a warning
+    warn = balance_priority_order is not None
+    
+    # for kube-vip v0.5.12+ the VIP that should be used for the service is going to be saved in the annotation "kube-vip.io/loadbalancerIPs"
+    # from Kubernetes v1.24+ on "spec.loadBalancerIP" is deprecated, but older setups may still use it
+    if annotations.get('kube-vip.io/loadbalancerIPs'):
+        vips = annotations['kube-vip.io/loadbalancerIPs'].split(",")
+    elif service.spec.load_balancer_ip:   # see https://github.com/kubernetes-client/python/blob/master/kubernetes/docs/V1ServiceSpec.md
+        if warn:
+            logger.warning("Service: %s - 'spec.loadBalancerIP' is deprecated and will eventually be removed in some future Kubernetes version to be on the save side, use the annotation 'kube-vip.io/loadbalancerIPs' too.", service_name)
+        # endif
+        vips = [service.spec.load_balancer_ip]
+    else:
+        if warn:
+            logger.warning("Service: %s - No dedicated VIPs defined! - trying to get IPs from status", service_name)
+        # endif
+        ingresses = []
+        if service.status is not None and service.status.load_balancer is not None:
+            ingresses = service.status.load_balancer.ingress or []
+        # endif
+        vips = [ingress.ip for ingress in ingresses if ingress.ip]
+    # endif
+    
+    return ServiceDescriptor(
+        namespace=service.metadata.namespace,
+        name=service_name,
+        resource_version=service.metadata.resource_version,
+        app=labels.get('app'),
+        balance_priority_order=balance_priority_order,
+        vips=tuple(vip.strip() for vip in vips if vip.strip()),
+        traffic_policy=service.spec.external_traffic_policy,
+        vip_host=annotations.get('kube-vip.io/vipHost'),
+    )
+# enddef
+
+
+def index_service_by_app(service):
+    return [(service.namespace, service.app)] if service.app is not None else []
+# enddef
+
+
+def index_service_by_vip(service):
+    return list(service.vips)
+# enddef
+
+
+def index_pod_by_app_and_node(pod):
+    return [(pod.namespace, pod.app, pod.node_name)] if pod.app is not None else []
+# enddef
+
+
+# in-memory stores fed by list+watch - lookups for services and pods are dictionary reads instead of LIST calls
+# if set, the namespaces and the pod label selector are sent to the Kubernetes-API, so only the needed objects are transferred
+service_informer = Informer(
+    "services",
+    v1_core.list_service_for_all_namespaces,
+    namespaced_list_func=v1_core.list_namespaced_service,
+    namespaces=lib.settings.global_watch_namespaces,
+    max_namespace_watches=lib.settings.global_watch_max_namespace_watches,
+    indexers={"app": index_service_by_app, "vip": index_service_by_vip},
+    # the store holds ServiceDescriptors - the annotations are only parsed when a service changed
+    transform=parse_service_descriptor,
+)
+pod_informer = Informer(
+    "pods",
+    v1_core.list_pod_for_all_namespaces,
+    namespaced_list_func=v1_core.list_namespaced_pod,
+    namespaces=lib.settings.global_watch_namespaces,
+    max_namespace_watches=lib.settings.global_watch_max_namespace_watches,
+    indexers={"app_node": index_pod_by_app_and_node},
+    # the store holds PodDescriptors - in slim mode they are read straight from the JSON of the list and watch responses
+    transform=None if lib.settings.global_watch_pods_slim else parse_pod_descriptor,
+    decode=decode_pod_descriptor if lib.settings.global_watch_pods_slim else None,
+    label_selector=lib.settings.global_watch_pod_label_selector,
+)
+
+def index_lease_by_holder(lease):
+    return [lease.holder_identity] if lease.holder_identity else []
+# enddef
+
+
+def is_kube_vip_lease(lease):
+    # leases created by kube-vip are prefixed with "kubevip-" - called with the V1Lease before it is reduced to a LeaseDescriptor
+    return lease.metadata.name.startswith("kubevip-")
+# enddef
+
+
+# nodes are cluster-wide, the Ready-condition is read from this store instead of calling read_node_status()
+# the store holds NodeDescriptors - only the name and the Ready-condition of every node are kept
+node_informer = Informer("nodes", v1_core.list_node, transform=parse_node_descriptor)
+
+# the current holder of every VIP is read from this store - the "holder" index answers which VIPs a node holds
+lease_informer = Informer(
+    "leases",
+    v1_coordination.list_lease_for_all_namespaces,
+    namespaced_list_func=v1_coordination.list_namespaced_lease,
+    namespaces=lib.settings.global_watch_namespaces,
+    max_namespace_watches=lib.settings.global_watch_max_namespace_watches,
+    indexers={"holder": index_lease_by_holder},
+    object_filter=is_kube_vip_lease,
+    # the store holds LeaseDescriptors - holder and name are all we need
+    transform=parse_lease_descriptor,
+    # every node renews its heartbeat-lease every few seconds - these are of no interest here
+    field_selector="metadata.namespace!=kube-node-lease",
+)
+
+# only used for sharding without a namespace-allowlist - the store holds the names of all namespaces
+namespace_informer = Informer("namespaces", v1_core.list_namespace, transform=lambda namespace: namespace.metadata.name)
+
+lease_holder_changes = metrics.Counter("kube_vip_watcher_lease_holder_changes_total", "Holder changes of kube-vip leases not made by the watcher itself")
+# (namespace, service) -> [Backoff, time of the last holder change] - only used by the lease informer thread
+lease_flip_backoffs = {}
+# (namespace, lease name) -> holder the watcher is setting right now - the watch event of our own patch may arrive
+# before the patch response was written to the store, so the store alone does not tell who changed a holder
+expected_lease_holders = {}
+balance_decisions = metrics.Counter("kube_vip_watcher_balance_decisions_total", "Services evaluated by balance() and whether patches were skipped or applied", ["decision"])
+failover_duration = metrics.Gauge("kube_vip_watcher_node_failover_duration_seconds", "Time from detecting a node leaving 'Ready' until the last of its VIPs was moved (last failover)")
+failover_vips_moved = metrics.Counter("kube_vip_watcher_node_failover_vips_moved_total", "VIPs moved away from nodes which left 'Ready'")
+vip_moves = metrics.Counter("kube_vip_watcher_vip_moves_total", "VIPs moved by the watcher - to the primary or to an alternative node of 'kubeVipBalancePriority'", ["target"])
+# path "balance" is measured from the first pod- or lease-event of a service, path "failover" from the node leaving "Ready"
+event_to_decision = metrics.Histogram("kube_vip_watcher_event_to_decision_seconds", "Time from the first event until the balance-decision for a service was made", ["path"])
+event_to_patch = metrics.Histogram("kube_vip_watcher_event_to_patch_seconds", "Time from the first event until the lease and annotation of a service were patched", ["path"])
+
+# pod events are collected per (namespace, service) - a burst of events for one service results in one balance()
+# different services are balanced in parallel by a pool of workers, the events of one service are always handled in order
+balance_queue = WorkQueue("balance", debounce_seconds=lib.settings.global_balance_debounce_seconds, maxsize=lib.settings.global_balance_queue_depth)
+
+# the pod events of the first list are not handed out - instead every service is reconciled once by startup_reconcile()
+started_at = time.monotonic()
+startup_complete = threading.Event()
+startup_duration = metrics.Gauge("kube_vip_watcher_startup_duration_seconds", "Time from the start of the watcher until the stores were filled and every service was reconciled once")
+
+def check_liveness():
+    # each watch gets an event or at least a bookmark every few minutes - if it stays silent for longer, the watch (or the
+    # loop processing its events) is stuck and a restart of the pod is the way out. Before the first list this is not known yet
+    informers = (pod_informer, service_informer, node_informer, lease_informer)
+    silent = []
+    for informer in informers:
+        seconds = informer.seconds_since_last_activity()
+        if seconds is not None and seconds > lib.settings.global_liveness_watch_silence_seconds:
+            silent.append("%s (%d seconds)" % (informer.name, seconds))
         # endif
     # endfor
-    return False
+    if silent:
+        return 503, "text/plain; charset=utf-8", "no watch events or bookmarks received for: %s\n" % ", ".join(silent)
+    # endif
+    return 200, "text/plain; charset=utf-8", "ok\n"
 # enddef
 
 
-def check_container_state(pod_container_statuses):
-    logger_name = "check_container_state"
-    logger = Cplogging(logger_name)
-    logger.debug(pod_container_statuses)
-    number_of_containers = len(pod_container_statuses)
-    ready_containers = 0
-    
-    for container_status in pod_container_statuses:
-        # container_status.ready is a boolean value
-        if container_status.ready:
-            ready_containers += 1
+def check_readiness():
+    # balance-decisions are only made from filled stores
+    not_synced = [informer.name for informer in (pod_informer, service_informer, node_informer, lease_informer) if not informer.has_synced()]
+    if not_synced:
+        return 503, "text/plain; charset=utf-8", "stores not synced yet: %s\n" % ", ".join(not_synced)
+    # endif
+    if not startup_complete.is_set():
+        return 503, "text/plain; charset=utf-8", "startup reconcile not finished yet\n"
+    # endif
+    return 200, "text/plain; charset=utf-8", "ok\n"
+# enddef
+
+
+def merge_events(old, new):
+    # the value queued per service is (number of events, time of the first event) - latencies are measured from the first event
+    return old[0] + new[0], min(old[1], new[1])
+# enddef
+
+
+# when a node leaves "Ready", the patches for all its VIPs are sent concurrently by this pool - it is used for nothing
+# else, so a failover never waits behind other work
+failover_executor = concurrent.futures.ThreadPoolExecutor(max_workers=lib.settings.global_failover_workers, thread_name_prefix="failover")
+
+# set in __main__ if leader election is enabled - only the leader balances, the other replicas keep their stores up to date
+leader_elector = None
+
+
+def is_leader():
+    # without leader election this replica is the only one - with sharding it is the only one for the namespaces it owns
+    return leader_elector is None or leader_elector.is_leader()
+# enddef
+
+
+def get_own_namespace():
+    # the namespace of the pod the watcher is running in
+    with open("/var/run/secrets/kubernetes.io/serviceaccount/namespace") as namespace_file:
+        return namespace_file.read().strip()
+    # endwith
+# enddef
+
+
+def enqueue_all_services():
+    # events seen while standing by were not queued - so every service to be balanced is checked once
+    now = time.monotonic()
+    for service in service_informer.list():
+        if service.balance_priority_order:
+            balance_queue.add((service.namespace, service.name), (1, now), merge=merge_events)
         # endif
     # endfor
+# enddef
+
+
+def on_started_leading():
+    logger_name = "on_started_leading"
+    logger = Cplogging(logger_name)
+    pod_informer.wait_for_sync()
+    enqueue_all_services()
+    logger.warning("Leader - queued all services for balancing")
+# enddef
+
+
+def on_stopped_leading():
+    logger_name = "on_stopped_leading"
+    logger = Cplogging(logger_name)
+    # another replica may be patching already - we must stop right away. After the restart we stand by with fresh stores
+    logger.error("Lost leadership - exiting")
+    Cplogging.flush_handlers()
+    os._exit(1)
+# enddef
+
+
+# set in __main__ if sharding is enabled - every replica only watches and balances the namespaces it owns
+shard_membership = None
+shard_lock = threading.Lock()
+shard_owned_namespaces = metrics.Gauge("kube_vip_watcher_shard_owned_namespaces", "Namespaces watched and balanced by this replica")
+
+
+def get_shard_namespaces():
+    # the namespaces split between the replicas - the allowlist if set, else all namespaces of the cluster
+    if lib.settings.global_watch_namespaces:
+        return list(lib.settings.global_watch_namespaces)
+    # endif
+    return namespace_informer.list()
+# enddef
+
+
+def owns_namespace(namespace):
+    # the ring changes as soon as the members change, the stores only once rebalance_shard() is through - in between
+    # the services of a namespace which moved to another replica must not be balanced anymore
+    return shard_membership is None or shard_membership.owns(namespace)
+# enddef
+
+
+def get_owned_namespaces():
+    return sorted(namespace for namespace in get_shard_namespaces() if shard_membership.owns(namespace))
+# enddef
+
+
+def rebalance_shard(members=None):
+    # called when the members or the namespaces change - the informers switch to the namespaces owned now. Runs in the
+    # notifier thread of the membership (or the namespace informer) and may wait for stores to sync, never in the renewal
+    logger_name = "rebalance_shard"
+    logger = Cplogging(logger_name)
+    with shard_lock:
+        owned = get_owned_namespaces()
+        if owned == pod_informer.namespaces:
+            return
+        # endif
+        added = set(owned) - set(pod_informer.namespaces)
+        # services and leases of added namespaces are listed first - the pod relist of a namespace then finds its services
+        for informer in (service_informer, lease_informer):
+            informer.set_namespaces(owned)
+        # endfor
+        for informer in (service_informer, lease_informer):
+            informer.wait_for_sync()
+        # endfor
+        pod_informer.set_namespaces(owned)
+        shard_owned_namespaces.set(len(owned))
+        logger.warning("Sharding - owning %d namespaces (%d added)", len(owned), len(added))
+    # endwith
+# enddef
+
+
+def on_namespace_event(event):
+    # only a namespace which changes its owner needs a rebalance - this keeps the relist of all namespaces cheap
+    if event['type'] not in ("ADDED", "DELETED"):
+        return
+    # endif
+    # the namespace store holds the names only
+    namespace = event['object']
+    owned = event['type'] == "ADDED" and shard_membership.owns(namespace)
+    if owned != (namespace in pod_informer.namespaces):
+        rebalance_shard()
+    # endif
+# enddef
+
+
+def is_node_ready(node):
+    return node is not None and node.ready is True
+# enddef
+
+
+def check_node_state(node_name):
+    logger_name = "check_node_state"
+    logger = Cplogging(logger_name)
+    # the "Ready"-condition is reduced to a boolean when the node is stored
+    node = node_informer.get(node_name)
+    if node is None or node.ready is None:
+        logger.error("Node %s not found or without 'Ready'-condition", node_name)
+        return False
+    # endif
     
-    if ready_containers == number_of_containers:
+    # fields are written in a single line which may be easier to be parsed by log-pattern analyzers
+    logger.debug("Node %s", node_name, ready=node.ready, ready_since=node.ready_since)
+    if node.ready:
+        logger.info("Node %s marked as 'Ready' since %s", node_name, node.ready_since)
         return True
-    else:
-        return False
     # endif
+    return False
 # enddef
 
 
 def get_namespaced_services_with_label(namespace, pod_labels_app, pod_name):
     logger_name = "get_namespaced_services_with_label"
     logger = Cplogging(logger_name)
-    try:
-        services = v1_core.list_namespaced_service(namespace)
-    except Exception as e:
-        logger.error("Exception when calling CoreV1Api->list_namespaced_service: %s\n" % e)
-        services = []
-    # endtry
-    list_of_services = []
-    
-    # get all services with app-label
-    for service in services.items:
-        try:
-            if service.metadata.labels['app'] == pod_labels_app:
-                list_of_services.append(service)
-            # endif
-        except:
-            # app-label not found for current service being checked - just skip
-            continue
-        # endtry
-    # endfor
+    # the index only holds services with an app-label
+    list_of_services = service_informer.by_index("app", (namespace, pod_labels_app))
     
     # now check if there is a service named exactly like the pod
-    single_service = next((item for item in list_of_services if item.metadata.name == pod_name), None)
+    single_service = next((item for item in list_of_services if item.name == pod_name), None)
     # we need to return a list for the next function - it can be empty if no service with app-label was found
     if single_service is None:
         logger.info("None-Explicit pod named service(s) found")
-        logger.debug("Service(s): %s" % str(list_of_services))
-        #logger.debug("Service(s): %s" % list_of_services)
+        logger.debug("Service(s) found", services=list_of_services)
         return list_of_services
     else:
         logger.info("Explicit pod named service found")
-        logger.debug("Service(s): %s" % str(single_service))
-        #logger.debug("Service(s): %s" % single_service)
+        logger.debug("Service(s) found", services=[single_service])
         return [single_service]
     # endif
 # enddef
@@ -137,263 +417,429 @@ def get_namespaced_services_with_label(namespace, pod_labels_app, pod_name):
 def get_namespaced_leases(service_name, namespace):
     logger_name = "get_namespaced_leases"
     logger = Cplogging(logger_name)
-    try:
-        # leases created by kube-vip are prefixed with "kubevip-"
-        lease = v1_coordination.read_namespaced_lease("kubevip-" + service_name, namespace)
-        lease_name = lease.metadata.name
-        lease_holder = lease.spec.holder_identity
-        logger.info("Service: %s - Lease: %s - Node: %s" % (service_name, lease_name, lease_holder))
-        return lease_holder
-    except:
-        logger.warning("Service: %s - No Lease kubevip-%s found" % (service_name, service_name))
+    # leases created by kube-vip are prefixed with "kubevip-"
+    lease = lease_informer.get("%s/kubevip-%s" % (namespace, service_name))
+    if lease is None:
+        logger.warning("Service: %s - No Lease kubevip-%s found", service_name, service_name)
         return None
-    # endtry
+    # endif
+    lease_name = lease.name
+    lease_holder = lease.holder_identity
+    logger.info("Service: %s - Lease: %s - Node: %s", service_name, lease_name, lease_holder)
+    return lease_holder
+# enddef
+
+
+def get_leases_held_by_node(node_name):
+    # all kube-vip leases - and so all VIPs - currently held by the given node
+    return lease_informer.by_index("holder", node_name)
+# enddef
+
+
+def on_lease_event(event):
+    logger_name = "on_lease_event"
+    logger = Cplogging(logger_name)
+    if event['type'] == "DELETED":
+        lease_flip_backoffs.pop((event['object'].namespace, event['object'].name[len("kubevip-"):]), None)
+    # endif
+    if event['type'] == "MODIFIED" and event.get('old_object') is not None:
+        old_holder = event['old_object'].holder_identity
+        new_holder = event['object'].holder_identity
+        if old_holder != new_holder and expected_lease_holders.get((event['object'].namespace, event['object'].name)) == new_holder:
+            # the change of our own patch
+            expected_lease_holders.pop((event['object'].namespace, event['object'].name), None)
+        elif old_holder != new_holder:
+            # set by someone else - e.g. kube-vip
+            lease_holder_changes.inc()
+            with Cplogging.context(namespace=event['object'].namespace, lease=event['object'].name, node=new_holder, event_type=event['type']):
+                logger.warning("Namespace %s - Lease: %s - holder changed from %s to %s", event['object'].namespace, event['object'].name, old_holder, new_holder)
+            # endwith
+            # check if the new holder is the one we want - but if kube-vip keeps changing the holder back, we wait longer every
+            # time instead of moving the VIP back and forth
+            if is_leader():
+                key = (event['object'].namespace, event['object'].name[len("kubevip-"):])
+                now = time.monotonic()
+                backoff, last_change_at = lease_flip_backoffs.get(key, (None, None))
+                if backoff is None or now - last_change_at > lib.settings.global_lease_flip_backoff_max_seconds:
+                    # equal jitter - at least half of the exponential delay, so every further change really waits longer
+                    backoff = Backoff(lib.settings.global_lease_flip_backoff_base_seconds, lib.settings.global_lease_flip_backoff_max_seconds, equal_jitter=True)
+                # endif
+                lease_flip_backoffs[key] = (backoff, now)
+                delay = backoff.next_delay()
+                logger.info("Namespace %s - Service: %s - balancing again in %.1f seconds", key[0], key[1], delay)
+                balance_queue.add(key, (1, now), merge=merge_events, delay_seconds=delay)
+            # endif
+        # endif
+    # endif
 # enddef
 
 
 def get_namespaced_pods_with_label_on_node(namespace, pod_labels_app, pod_node_name):
     logger_name = "get_namespaced_pods_with_label_on_node"
     logger = Cplogging(logger_name)
-    try:
-        pods = v1_core.list_namespaced_pod(namespace)
-    except Exception as e:
-        logger.error("Exception when calling CoreV1Api->list_namespaced_pod: %s\n" % e)
-        pods = []
-    # endtry
     list_of_pods = []
     
-    # get all pods with app-label and node_name
-    for pod in pods.items:
-        try:
-            if pod.metadata.labels['app'] == pod_labels_app and pod.spec.node_name == pod_node_name:
-                # we do not explicitly exclude the pod we are currently checking for - maybe it got back online and is ready?
-                if check_container_state(pod.status.container_statuses):
-                    list_of_pods.append(pod)
-            # endif
-        except:
-            # app-label not found for current pod being checked - just skip
-            continue
-        # endtry
+    # get all pods with app-label and node_name from the index
+    for pod in pod_informer.by_index("app_node", (namespace, pod_labels_app, pod_node_name)):
+        # we do not explicitly exclude the pod we are currently checking for - maybe it got back online and is ready?
+        if pod.containers_ready:
+            list_of_pods.append(pod)
+        # endif
     # endfor
     
-    logger.info("Number of suitable pods on node %s: %d" % (pod_node_name, len(list_of_pods)))
+    logger.info("Number of suitable pods on node %s: %d", pod_node_name, len(list_of_pods))
     return list_of_pods
 # enddef
 
 
-def balance(list_of_services, pod_container_statuses, pod_node_name, pod_labels_app):
+def compute_target_node(service_name, namespace, pod_labels_app, balance_priority_order):
+    logger_name = "compute_target_node"
+    logger = Cplogging(logger_name)
+    # the VIP belongs to the first node in the priority list which is ready and runs at least one ready pod with the app-label
+    for node in balance_priority_order:
+        if not check_node_state(node):
+            logger.info("Service: %s - Node %s not available - continuing with search for suitable node with healthy pods.", service_name, node)
+            continue
+        # endif
+        
+        # we do not explicitly exclude the pod an event was received for - maybe it got back online and is ready?
+        if len(get_namespaced_pods_with_label_on_node(namespace, pod_labels_app, node)) >= 1:
+            return node
+        # endif
+        logger.info("Service: %s - No remaining pods on node %s found - continuing with search for suitable node with healthy pods.", service_name, node)
+    # endfor
+    return None
+# enddef
+
+
+def get_services_by_vip(vip):
+    return service_informer.by_index("vip", vip)
+# enddef
+
+
+def service_log_context(service):
+    # JSON log-lines written while a service is balanced carry these keys, so they can be queried without parsing the message
+    return Cplogging.context(namespace=service.namespace, service=service.name, vip=",".join(service.vips))
+# enddef
+
+
+def plan_service(service):
+    logger_name = "plan_service"
+    logger = Cplogging(logger_name)
+    service_name = service.name
+    namespace = service.namespace
+    
+    if not service.balance_priority_order:
+        logger.warning("Service: %s - Service missing annotation 'kubeVipBalancePriority'", service_name)
+        return None
+    # endif
+    balance_priority_order = list(service.balance_priority_order)
+    logger.info("Service: %s - Balance Priority: %s - Traffic Policy: %s - Loadbalancer-IP: %s", service_name, balance_priority_order, service.traffic_policy, ",".join(service.vips))
+    
+    # services sharing a VIP are moved together by kube-vip - different priorities would make them fight each other
+    for vip in service.vips:
+        for other_service in get_services_by_vip(vip):
+            if other_service.balance_priority_order is not None and other_service.balance_priority_order != service.balance_priority_order:
+                logger.warning("Service: %s - VIP %s shared with service %s/%s which has a different 'kubeVipBalancePriority'", service_name, vip, other_service.namespace, other_service.name)
+            # endif
+        # endfor
+    # endfor
+    
+    lease_holder = get_namespaced_leases(service_name, namespace)
+    if lease_holder is None:
+        # kube-vip creates the lease as soon as it serves the VIP - there is nothing we could move yet
+        return None
+    # endif
+    
+    target_node = compute_target_node(service_name, namespace, service.app, balance_priority_order)
+    if target_node is None:
+        logger.error("Service: %s - No suitable node found", service_name)
+        return None
+    # endif
+    
+    # the current and the desired state of the service - None if the service cannot be balanced
+    return {
+        "namespace": namespace,
+        "service_name": service_name,
+        "balance_priority_order": balance_priority_order,
+        "lease_holder": lease_holder,
+        "vip_host": service.vip_host,
+        "target_node": target_node,
+    }
+# enddef
+
+
+def plan_needs_patch(plan):
+    return plan["lease_holder"] != plan["target_node"] or plan["vip_host"] != plan["target_node"]
+# enddef
+
+
+def apply_plan(plan):
+    logger_name = "apply_plan"
+    logger = Cplogging(logger_name)
+    namespace = plan["namespace"]
+    service_name = plan["service_name"]
+    target_node = plan["target_node"]
+    
+    # every patch is a write to the Kubernetes-API and a patched lease makes kube-vip move the VIP - so only patch what differs
+    logger.warning("Service: %s - Lease holder %s and annotation 'kube-vip.io/vipHost' %s differ from target node %s", service_name, plan["lease_holder"], plan["vip_host"], target_node)
+    if plan["vip_host"] != target_node:
+        try:
+            # if we do not patch this value kube-vip removes the VIP sometimes completely for about a minute
+            service_body_patch = {"metadata": {"annotations": {"kube-vip.io/vipHost": target_node}}}
+            service_patch_response = v1_core.patch_namespaced_service(service_name, namespace, service_body_patch)
+            service_informer.update(service_patch_response)
+            logger.info("Service: %s - Patched service with annotation 'kube-vip.io/vipHost' %s", service_name, target_node)
+        except Exception as e:
+            logger.error("Exception when calling CoreV1Api->patch_namespaced_service: %s", e)
+            raise
+        # endtry
+    # endif
+    
+    if plan["lease_holder"] != target_node:
+        try:
+            # we have to use "holderIdentity" instead of "holder_identity"
+            lease_body_patch = {"spec": {"holderIdentity": target_node}}
+            # on_lease_event() must not take the watch event of this patch for a change made by kube-vip
+            expected_lease_holders[(namespace, "kubevip-" + service_name)] = target_node
+            lease_patch_response = v1_coordination.patch_namespaced_lease("kubevip-" + service_name, namespace, lease_body_patch)
+            lease_informer.update(lease_patch_response)
+            logger.info("Service: %s - Patched lease with 'holderIdentity' %s", service_name, target_node)
+        except Exception as e:
+            expected_lease_holders.pop((namespace, "kubevip-" + service_name), None)
+            logger.error("Exception when calling CoordinationV1Api->patch_namespaced_lease: %s", e)
+            raise
+        # endtry
+    # endif
+    
+    if target_node == plan["balance_priority_order"][0]:
+        logger.info("Service: %s - HOLDER CHANGED TO PRIMARY NODE %s and service's annotation 'kube-vip.io/vipHost' updated to %s", service_name, target_node, target_node)
+        vip_moves.inc(target="primary")
+    else:
+        vip_moves.inc(target="alternative")
+        logger.warning("Service: %s - HOLDER CHANGED TO ALTERNATIVE NODE %s and service's annotation 'kube-vip.io/vipHost' updated to %s", service_name, target_node, target_node)
+    # endif
+# enddef
+
+
+def balance(list_of_services, event_at=None):
     logger_name = "balance"
     logger = Cplogging(logger_name)
-    number_of_services = len(list_of_services)
-    service_counter = 0
-    if number_of_services == 0:
+    if len(list_of_services) == 0:
         logger.error("No service(s) found with needed app-label")
         return False  # end def
-    else:
-        for service in list_of_services:
-            service_name = service.metadata.name
-            service_counter += 1
-            # logger.info("service_count: %d" % service_counter)
+    # endif
+    
+    result = True
+    for service in list_of_services:
+        with service_log_context(service):
+            balance_decisions.inc(decision="evaluated")
             
-            try:
-                # get the value of annotation 'kubeVipBalancePriority' and other values
-                namespace = service.metadata.namespace
-                
-                # from Kubernetes v1.24+ on "spec.loadBalancerIP" is going to be deprecated and should be changed to 
-                # annotations. But currently both, the annotation "kube-vip.io/loadbalancerIPs" and the spec-parameter,
-                # must be used in a service-manifest to make it work correctly.
-                try:
-                    load_balancer_ip = service.spec.load_balancer_ip   # see https://github.com/kubernetes-client/python/blob/master/kubernetes/docs/V1ServiceSpec.md
-                    logger.warning("Service: %s - 'spec.loadBalancerIP' is deprecated and will eventually be removed in some future Kubernetes version to be on the save side, use the annotation 'kube-vip.io/loadbalancerIPs' too." % service_name)
-                except:
-                    load_balancer_ip = None
-                # endtry
-                
-                # for kube-vip v0.5.12+ the VIP that should be used for the service is going to be saved in the annotation "kube-vip.io/loadbalancerIPs"
-                if load_balancer_ip is None:
-                    try:
-                        load_balancer_ip = service.metadata.annotations['kube-vip.io/loadbalancerIPs']
-                    except:
-                        # not really tested - theoretically it should work :)
-                        logger.warning("Service: %s - No dedicated VIPs defined! - trying to get IPs from status" % service_name)
-
-                        load_balancer_ip_list = []
-                        for vip in service.status.load_balancer.ingress:
-                            load_balancer_ip_list = load_balancer_ip.append(vip.ip)
-                        # endfor
-
-                        load_balancer_ip = ','.join(load_balancer_ip_list)
-                    # endtry
-                # endif
-                
-                try:
-                    traffic_policy = service.spec.external_traffic_policy
-                except:
-                    traffic_policy = None
-                # endtry
-                
-                balance_priority_string = service.metadata.annotations['kubeVipBalancePriority']
-                balance_priority_order = str(balance_priority_string).split(",")
-                balance_priority_order = [sub_element.strip() for sub_element in balance_priority_order]  # remove whitespaces for each element in the list fixed_section
-                logger.info("Service: %s - Balance Priority: %s - Traffic Policy: %s - Loadbalancer-IP: %s" % (service_name, balance_priority_order, traffic_policy, load_balancer_ip))
-            except:
-                logger.warning("Service: %s - Service missing annotation 'kubeVipBalancePriority'" % service_name)
-                
-                # check if we need to continue with next service
-                if number_of_services == service_counter:
-                    return False  # end def
-                else:
-                    continue  # check next service
-                # endif
-            # endtry
+            # first step: the desired state
+            plan = plan_service(service)
+            if event_at is not None:
+                event_to_decision.observe(time.monotonic() - event_at, path="balance")
+            # endif
+            if plan is None:
+                result = False
+                continue  # check next service
+            # endif
+            
+            # second step: compare with the current state
+            if not plan_needs_patch(plan):
+                logger.info("Service: %s - Current lease holder %s OK - no need to move VIP", plan["service_name"], plan["lease_holder"])
+                balance_decisions.inc(decision="skipped")
+                continue  # check next service
+            # endif
             
             try:
-                lease_holder = get_namespaced_leases(service_name, namespace)
-                
-                # now we check if pod is running and if the lease_holder is corresponding to the first node in the priority list
-                # if not we patch the holder-value in the lease after checking that the node to swtich to is available and has a running pod
-                # TODO: find better way to check if rebalancing is really needed :| - currently we patch the lease in some cases even though it's not really needed
-                if lease_holder == balance_priority_order[0] and check_container_state(pod_container_statuses) and check_node_state(pod_node_name):
-                    logger.info("Service: %s - Current lease holder OK and pod's containers are ready" % service_name)
-                    
-                    # check if we need to continue with next service
-                    if number_of_services == service_counter:
-                        return True  # end def
-                    else:
-                        continue  # check next service
-                    # endif
-                else:
-                    logger.warning("Service: %s - Detected wrong lease holder OR issues with pod's containers OR the node - further checking if VIP must be moved" % service_name)
-                    
-                    service_ok = False
-                    for node in balance_priority_order:
-                        # we now go through the nodes until we find a suitable pod
-                        if not service_ok:
-                            # check if node is available and ready
-                            if check_node_state(node):
-                                # check if another pod with same app-label is running - this would mean no VIP must be moved
-                                try:
-                                    list_of_pods_on_node = get_namespaced_pods_with_label_on_node(namespace, pod_labels_app, node)
-
-                                    # check if at least one ready pod was found
-                                    if len(list_of_pods_on_node) >= 1:
-                                        for pod in list_of_pods_on_node:
-                                            """
-                                            logger.debug(pod)
-                                            try:
-                                                pod_deletion_timestamp = pod.metadata.deletion_timestamp
-                                                logger.debug("pod deletion event detected: %s" % str(pod_deletion_timestamp))
-                                            except:
-                                                logger.debug("pod_deletion not found")
-                                                logger.debug(item)
-                                                pod_deletion_timestamp = None
-                                            """
-                                            
-                                            # if the pod is on the same node where the other failed and the remaining pod is healthy, the VIP doesn't need to be moved
-                                            if check_container_state(pod.status.container_statuses) \
-                                                    and pod.spec.node_name == pod_node_name \
-                                                    and lease_holder == balance_priority_order[0]:
-                                                logger.info("Service: %s - Found healthy pod %s on node %s. Current lease holder OK and no need to move VIP" % (service_name, pod.metadata.name, pod.spec.node_name))
-                                                
-                                                # check if we need to continue with next service
-                                                if number_of_services == service_counter:
-                                                    return True  # end def
-                                                else:
-                                                    service_ok = True
-                                                    break  # get out of "pod-check loop" and check next service
-                                                # endif
-                                            elif check_container_state(pod.status.container_statuses):  # else move the VIP to the node
-                                                # optional possible to only move if really needed with:
-                                                # if traffic_policy == "Local":  # and indent code below a little
-                                                # We have found another ready pod on another node - we have to update the lease and the service manifest
-                                                try:
-                                                    # if we do not patch this value kube-vip removes the VIP sometimes completely for about a minute
-                                                    service_body_patch = {"metadata": {"annotations": {"kube-vip.io/vipHost": node}}}
-                                                    service_patch_response = v1_core.patch_namespaced_service(service.metadata.name, namespace, service_body_patch)
-                                                    logger.info("Service: %s - Patched service with annotation 'kube-vip.io/vipHost' %s" % (service_name, node))
-                                                except Exception as e:
-                                                    logger.error("Exception when calling CoreV1Api->patch_namespaced_service: %s\n" % e)
-                                                    sys.exit(1)
-                                                # endtry
-                                                
-                                                try:
-                                                    # we have to use "holderIdentity" instead of "holder_identity"
-                                                    lease_body_patch = {"spec": {"holderIdentity": node}}
-                                                    lease_patch_response = v1_coordination.patch_namespaced_lease("kubevip-" + service.metadata.name, namespace, lease_body_patch)
-                                                    logger.info("Service: %s - Patched lease with 'holderIdentity' %s" % (service_name, node))
-                                                except Exception as e:
-                                                    logger.error("Exception when calling CoordinationV1Api->patch_namespaced_lease: %s\n" % e)
-                                                    sys.exit(1)
-                                                # endtry
-                                                
-                                                if node == balance_priority_order[0]:
-                                                    logger.info("Service: %s - HOLDER CHANGED TO PRIMARY NODE %s and service's annotation 'kube-vip.io/vipHost' updated to %s" % (
-                                                        service_name,
-                                                        lease_patch_response.spec.holder_identity,
-                                                        service_patch_response.metadata.annotations['kube-vip.io/vipHost'])
-                                                    )
-                                                    
-                                                    # check if we need to continue with next service
-                                                    if number_of_services == service_counter:
-                                                        return True  # end def
-                                                    else:
-                                                        service_ok = True
-                                                        break  # get out of "pod-check loop" and check next service
-                                                    # endif
-                                                else:
-                                                    logger.warning("Service: %s - HOLDER CHANGED TO ALTERNATIVE NODE %s and service's annotation 'kube-vip.io/vipHost' updated to %s" % (
-                                                        service_name,
-                                                        lease_patch_response.spec.holder_identity,
-                                                        service_patch_response.metadata.annotations['kube-vip.io/vipHost'])
-                                                    )
-                                                    
-                                                    # check if we need to continue with next service
-                                                    if number_of_services == service_counter:
-                                                        return True  # end def
-                                                    else:
-                                                        service_ok = True
-                                                        break  # get out of "pod-check loop" and check next service
-                                                    # endif
-                                                # endif
-                                                # optional possible to only move if really needed with:
-                                                # else:
-                                                #     logger.info("Traffic-Policy not 'Local' and node %s available so no need to move VIP" % node)
-                                                # endif
-                                            # endif
-                                        # endfor
-                                    else:
-                                        logger.info("Service: %s - No remaining pods on node found - continuing with search for suitable node with healthy pods." % service_name)
-                                    # endif
-                                except Exception as e:
-                                    logger.error("Exception when calling get_namespaced_pods_with_label_on_node: %s\n" % e)
-                                # endtry
-                            else:
-                                logger.info("Service: %s - Node %s not available - continuing with search for suitable node with healthy pods." % (service_name, node))
-                            # endif
-                        else:
-                            # check if we need to continue with next service
-                            if number_of_services == service_counter:
-                                return True  # end def
-                            else:
-                                break  # get out of "node-check loop" and check next service
-                            # endif
-                        # endif
-                    else:
-                        # check if we need to continue with next service
-                        if number_of_services == service_counter:
-                            logger.error("Service: %s - No suitable node found" % service_name)
-                            return False  # end def
-                        else:
-                            continue  # check next service
-                        # endif
-                    # endfor
-                # endif
-            except:
-                logger.warning("Service: %s - No Lease kubevip-%s found" % service.metadata.name)
+                apply_plan(plan)
+            except Exception:
+                sys.exit(1)
+            # endtry
+            balance_decisions.inc(decision="applied")
+            if event_at is not None:
+                event_to_patch.observe(time.monotonic() - event_at, path="balance")
+            # endif
+        # endwith
+    # endfor
+    return result
+# enddef
+
+
+def on_node_event(event):
+    # a node leaving "Ready" moves all its VIPs at once - instead of one by one as the events of its pods come in
+    node = event['object']
+    if not is_leader():
+        return
+    # endif
+    if event['type'] == "DELETED" or (event['type'] == "MODIFIED" and is_node_ready(event.get('old_object')) and not is_node_ready(node)):
+        # the node watch must go on while we patch
+        # a new thread starts with an empty log context
+        with Cplogging.context(node=node.name, event_type=event['type']):
+            context = contextvars.copy_context()
+        # endwith
+        thread = threading.Thread(target=context.run, args=(failover_node, node.name, time.monotonic()), name="failover-" + node.name)
+        thread.daemon = True
+        thread.start()
+    # endif
+# enddef
+
+
+def failover_service(key, detected_at):
+    # runs in the failover pool - returns True if the VIP was moved. The key is claimed in the balance queue meanwhile, so
+    # no balance worker handles the same service at the same time and the patches of a service stay in order
+    balance_queue.claim(key)
+    try:
+        service = service_informer.get("%s/%s" % key)
+        if service is None:
+            return False
+        # endif
+        balance_decisions.inc(decision="evaluated")
+        with service_log_context(service):
+            # the decision is made once the service is ours - a balance worker may just have moved the VIP
+            plan = plan_service(service)
+            event_to_decision.observe(time.monotonic() - detected_at, path="failover")
+            if plan is None:
+                return False
+            elif not plan_needs_patch(plan):
+                balance_decisions.inc(decision="skipped")
                 return False
+            # endif
+            apply_plan(plan)
+            balance_decisions.inc(decision="applied")
+            failover_vips_moved.inc()
+            event_to_patch.observe(time.monotonic() - detected_at, path="failover")
+            return True
+        # endwith
+    finally:
+        balance_queue.done(key)
+    # endtry
+# enddef
+
+
+def failover_node(node_name, detected_at):
+    logger_name = "failover_node"
+    logger = Cplogging(logger_name)
+    # node events may arrive before main() has listed the pods for the first time
+    pod_informer.wait_for_sync()
+    leases = get_leases_held_by_node(node_name)
+    logger.warning("Node %s left 'Ready' - %d VIP(s) currently held by it", node_name, len(leases))
+    keys = [(lease.namespace, lease.name[len("kubevip-"):]) for lease in leases if owns_namespace(lease.namespace)]
+    
+    def requeue_failed(key, future):
+        # the normal balance-path tries again - also for patches failing after we stopped waiting for them
+        if future.cancelled() or future.exception() is not None:
+            balance_queue.add(key, (1, time.monotonic()), merge=merge_events)
+        # endif
+    # enddef
+    
+    # everything needed for the decisions is in the stores - the services are planned and patched concurrently
+    # the threads of the executor do not inherit the log context - so every task takes it along
+    futures = []
+    for key in keys:
+        future = failover_executor.submit(contextvars.copy_context().run, failover_service, key, detected_at)
+        future.add_done_callback(lambda future, key=key: requeue_failed(key, future))
+        futures.append(future)
+    # endfor
+    done, not_done = concurrent.futures.wait(futures, timeout=lib.settings.global_failover_timeout_seconds)
+    moved = sum(1 for future in done if future.exception() is None and future.result())
+    
+    duration = time.monotonic() - detected_at
+    failover_duration.set(duration)
+    if not_done:
+        logger.error("Node %s - %d of %d VIP(s) not moved within %d seconds", node_name, len(not_done), len(keys), lib.settings.global_failover_timeout_seconds)
+    else:
+        logger.warning("Node %s - moved %d of %d VIP(s) in %.3f seconds", node_name, moved, len(keys), duration)
+    # endif
+# enddef
+
+
+def reconcile_service(key, events):
+    logger_name = "reconcile_service"
+    logger = Cplogging(logger_name)
+    namespace, service_name = key
+    number_of_events, first_event_at = events
+    
+    # the decision only depends on the current state in the stores - not on the pod an event was received for
+    service = service_informer.get("%s/%s" % (namespace, service_name))
+    if service is None:
+        logger.warning("Service: %s - Service not found anymore in namespace %s - nothing to balance", service_name, namespace)
+        return False
+    # endif
+    
+    if not owns_namespace(namespace):
+        logger.info("Namespace %s - Service: %s - namespace moved to another replica - nothing to balance", namespace, service_name)
+        return False
+    # endif
+    
+    logger.info("Namespace %s - Service: %s - balancing after %d event(s)", namespace, service_name, number_of_events)
+    return balance([service], first_event_at)
+# enddef
+
+
+def reconcile_service_in_context(key, events):
+    with Cplogging.context(namespace=key[0], service=key[1]):
+        return reconcile_service(key, events)
+    # endwith
+# enddef
+
+
+def startup_reconcile_service(key, started_at):
+    # runs in the startup pool - like failover_service() the key is claimed in the balance queue meanwhile, so a failover
+    # or a balance worker never patches the same service at the same time
+    balance_queue.claim(key)
+    try:
+        return reconcile_service_in_context(key, (1, started_at))
+    finally:
+        balance_queue.done(key)
+    # endtry
+# enddef
+
+
+def startup_reconcile():
+    logger_name = "startup_reconcile"
+    logger = Cplogging(logger_name)
+    # the stores are filled - every service is balanced exactly once in parallel, instead of once per pod of the first list
+    reconcile_started_at = time.monotonic()
+    keys = [(service.namespace, service.name) for service in service_informer.list() if service.balance_priority_order]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=lib.settings.global_startup_reconcile_workers, thread_name_prefix="startup") as executor:
+        futures = dict((executor.submit(contextvars.copy_context().run, startup_reconcile_service, key, reconcile_started_at), key) for key in keys)
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except SystemExit:
+                logger.error("Failed to patch service or lease for %s/%s - exiting", *futures[future])
+                Cplogging.flush_handlers()
+                os._exit(1)
+            except Exception as e:
+                logger.error("Exception-Type: %s, Message: %s", type(e).__name__, e)
             # endtry
         # endfor
-    # endif
+    # endwith
+    logger.info("reconciled %d services in %.3f seconds", len(keys), time.monotonic() - reconcile_started_at)
+# enddef
+
+
+def balance_worker():
+    logger_name = "balance_worker"
+    logger = Cplogging(logger_name)
+    while True:
+        key, events = balance_queue.get()
+        try:
+            reconcile_service_in_context(key, events)
+        except SystemExit:
+            # balance() exits if a patch fails so the pod gets restarted - this must end the whole process and not only this thread
+            logger.error("Failed to patch service or lease for %s/%s - exiting", *key)
+            # os._exit() skips the atexit-handlers - queued log records have to be written before
+            Cplogging.flush_handlers()
+            os._exit(1)
+        except Exception as e:
+            logger.error("Exception-Type: %s, Message: %s", type(e).__name__, e)
+        finally:
+            balance_queue.done(key)
+        # endtry
+    # endwhile
 # enddef
 
 
@@ -403,45 +849,52 @@ def main():
     
     # timeout_seconds=0 ...... the connection will be closed by Kubernetes after about 1 hour
     # timeout_seconds=1800 ... the connection should reconnect after 30 minutes
-    for item in w.stream(v1_core.list_pod_for_all_namespaces, timeout_seconds=1800):
+    # a reconnect resumes from the last seen resourceVersion - only the first start or an expired resourceVersion lists all pods again
+    # the pod store is updated before an event is handed out, so lookups in balance() already see the new state
+    for item in pod_informer.stream(timeout_seconds=1800):
+        event_received_at = time.monotonic()
         try:
             # first we get pods where we need the VIP balanced
-            if bool(item['object'].metadata.annotations['kubeVipBalanceIP']):
-                # testing something
-                # if item['object'].metadata.deletion_timestamp is not None:
-                #     logger.debug(str(item['object'].metadata.deletion_timestamp))
-                # logger.debug(str(item))
-                pod_name = item['object'].metadata.name
-                namespace = item['object'].metadata.namespace
+            # the event holds the PodDescriptor as stored
+            pod = item['object']
+            if pod.balance_ip:
+                pod_name = pod.name
+                namespace = pod.namespace
                 
-                try:
-                    pod_labels_app = item['object'].metadata.labels['app']
-                except:
-                    pod_labels_app = None
+                pod_labels_app = pod.app
+                if pod_labels_app is None:
                     logger.warning("App-Label not set")
-                # endtry
+                # endif
                 
                 if pod_labels_app is not None:
-                    pod_node_name = item['object'].spec.node_name
-                    pod_status_phase = item['object'].status.phase
-                    pod_container_statuses = item['object'].status.container_statuses
-                    
-                    logger.info("Namespace %s - Pod: %s - App-Label: %s - Node-Name: %s - Status: %s - Stream-Event-Type: %s" % (namespace, pod_name, pod_labels_app, pod_node_name, pod_status_phase, item['type']))
-                    # in the next step we will check if a rebalance is needed
+                    pod_node_name = pod.node_name
+                    pod_status_phase = pod.phase
                     
-                    # then we get the service corresponding to the pod
-                    list_of_services = get_namespaced_services_with_label(namespace, pod_labels_app, pod_name)
-                    if len(list_of_services) >= 1:
-                        balance(list_of_services, pod_container_statuses, pod_node_name, pod_labels_app)
-                    else:
-                        logger.warning("No services found")
-                    # endif
+                    with Cplogging.context(namespace=namespace, pod=pod_name, node=pod_node_name, event_type=item['type']):
+                        logger.info("Namespace %s - Pod: %s - App-Label: %s - Node-Name: %s - Status: %s - Stream-Event-Type: %s", namespace, pod_name, pod_labels_app, pod_node_name, pod_status_phase, item['type'])
+                        # in the next step we will check if a rebalance is needed
+                        
+                        # then we get the service corresponding to the pod
+                        list_of_services = get_namespaced_services_with_label(namespace, pod_labels_app, pod_name)
+                        if not is_leader():
+                            # the stores are up to date - the leader does the balancing
+                            pass
+                        elif len(list_of_services) >= 1:
+                            # the value counts the events collapsed into one balance-run
+                            for service in list_of_services:
+                                balance_queue.add((namespace, service.name), (1, event_received_at), merge=merge_events)
+                            # endfor
+                        else:
+                            logger.warning("No services found")
+                        # endif
+                    # endwith
                 else:
-                    logger.warning("Ignoring %s in Namespace %s because App-Label is not set" % (pod_name, namespace))
+                    logger.warning("Ignoring %s in Namespace %s because App-Label is not set", pod_name, namespace)
                 # endif
         except Exception as e:
-            # if pod has not such annotation just skip
-            pass
+            # one broken event must not end the pod-watch - the store is already updated, the next event of the service
+            # queues it again
+            logger.error("Pod %s - could not queue the services - Exception-Type: %s, Message: %s", pod_informer.key(item['object']), type(e).__name__, e)
         # endtry
     # endfor
 # endmain
@@ -451,46 +904,128 @@ if __name__ == '__main__':
     logger_name = "if_main"
     logger = Cplogging(logger_name)
     
-    reconnect_time_threshold = 1  # if a reconnect happens within less than a second
-    reconnect_count_too_fast = 0   # init counter value
-    reconnect_max_tries = 5       # maximum ammount of reconnects in sequence
-    reconnect_tries_left = reconnect_max_tries  # init variable to determine how many reconnects in sequence are still allowed
-    reconnect_in_seq = False      # init value for dertermining if reconnect happened in sequence in set time_threshold
+    reconnect_time_threshold = 1  # a pod-watch ending within less than a second counts as failed
     
     try:
-        # ugly solution for reconnect
-        # if reconnects happen too fast in sequence, this might indicate that there is some problem. So we exit the script/pod so that we do not hammer the Kubernetes API too much :)
+        # the probes of the pod need the HTTP-server - so it is always started
+        http_server = HttpServer(lib.settings.global_http_port)
+        http_server.add_route("/metrics", lambda: (200, "text/plain; version=0.0.4; charset=utf-8", metrics.exposition()))
+        http_server.add_route("/healthz", check_liveness)
+        http_server.add_route("/readyz", check_readiness)
+        http_server.start()
+        
+        if lib.settings.global_sharding_enable:
+            # the namespaces are split between the replicas - every replica only lists and watches the namespaces it owns
+            if not lib.settings.global_watch_namespaces:
+                namespace_informer.start()
+                namespace_informer.wait_for_sync()
+            # endif
+            shard_membership = ShardMembership(
+                v1_coordination,
+                lib.settings.global_sharding_group,
+                lib.settings.global_sharding_namespace or get_own_namespace(),
+                socket.gethostname(),
+                lease_duration_seconds=lib.settings.global_sharding_lease_duration_seconds,
+                renew_period_seconds=lib.settings.global_sharding_renew_period_seconds,
+                virtual_nodes=lib.settings.global_sharding_virtual_nodes,
+            )
+            shard_membership.start()
+            shard_membership.wait_for_members()
+            shard_namespaces = get_owned_namespaces()
+            for informer in (service_informer, pod_informer, lease_informer):
+                informer.set_namespaces(shard_namespaces)
+            # endfor
+            shard_owned_namespaces.set(len(shard_namespaces))
+        # endif
+        
+        # the service, node and lease stores are kept up to date in the background - pod events are only processed after they are filled
+        lease_informer.add_event_handler(on_lease_event)
+        node_informer.add_event_handler(on_node_event)
+        for informer in (service_informer, node_informer, lease_informer):
+            informer.start()
+        # endfor
+        for informer in (service_informer, node_informer, lease_informer):
+            informer.wait_for_sync()
+            logger.info("%s store synced", informer.name)
+        # endfor
+        # the first list of the pods fills the store without events - main() then only gets the changes since then
+        pod_informer.prime()
+        logger.info("%s store synced", pod_informer.name)
+        
+        # balance() runs in a pool of worker threads, so neither the debounce-window nor a slow API call blocks the watch
+        for worker_number in range(lib.settings.global_balance_workers):
+            worker = threading.Thread(target=balance_worker, name="balance-worker-%d" % worker_number)
+            worker.daemon = True
+            worker.start()
+        # endfor
+        logger.info("started %d balance worker(s)", lib.settings.global_balance_workers)
+        
+        if lib.settings.global_sharding_enable:
+            # from now on joining or leaving replicas and new or deleted namespaces move namespaces between the replicas
+            shard_membership.on_members_changed = rebalance_shard
+            if not lib.settings.global_watch_namespaces:
+                namespace_informer.add_event_handler(on_namespace_event)
+            # endif
+            rebalance_shard()
+        elif lib.settings.global_leader_election_enable:
+            # the pod-watch below runs on every replica, so the stores of a standby replica are always up to date
+            leader_elector = LeaderElector(
+                v1_coordination,
+                lib.settings.global_leader_election_lease_name,
+                lib.settings.global_leader_election_namespace or get_own_namespace(),
+                socket.gethostname(),
+                lease_duration_seconds=lib.settings.global_leader_election_lease_duration_seconds,
+                renew_deadline_seconds=lib.settings.global_leader_election_renew_deadline_seconds,
+                retry_period_seconds=lib.settings.global_leader_election_retry_period_seconds,
+                on_started_leading=on_started_leading,
+                on_stopped_leading=on_stopped_leading,
+            )
+            leader_elector.start()
+        # endif
+        
+        if leader_elector is None:
+            # with leader election the new leader queues every service once when it takes over
+            startup_reconcile()
+        # endif
+        startup_complete.set()
+        time_to_ready = time.monotonic() - started_at
+        startup_duration.set(time_to_ready)
+        logger.warning("ready after %.3f seconds - processing pod events from now on", time_to_ready)
+        
+        # main() returns when the pod-watch times out and raises if the connection fails. The stores and the last seen
+        # resourceVersion are kept, so a reconnect only resumes the watch - the process is not restarted for an API-server blip.
+        # Failed or too short connections are retried with a jittered exponential backoff and after too many in sequence
+        # the circuit breaker pauses reconnecting, so we do not hammer the Kubernetes API :)
+        reconnect_backoff = Backoff(lib.settings.global_reconnect_backoff_base_seconds, lib.settings.global_reconnect_backoff_max_seconds)
+        reconnect_breaker = CircuitBreaker("pod-watch", lib.settings.global_reconnect_breaker_failures, lib.settings.global_reconnect_breaker_open_seconds)
         while True:
-            connect_start = time.time()
-            main()
-            connect_stop = time.time()
-            connect_duration = connect_stop - connect_start
+            reconnect_breaker.wait()
+            connect_start = time.monotonic()
+            try:
+                main()
+                connect_duration = time.monotonic() - connect_start
+                connect_failed = connect_duration < reconnect_time_threshold
+                if connect_failed:
+                    logger.warning("pod-watch ended within %.5f seconds, which might indicate a problem", connect_duration)
+                # endif
+            except Exception as e:
+                connect_failed = True
+                logger.error("pod-watch failed - Exception-Type: %s, Message: %s", type(e).__name__, e)
+            # endtry
             
-            if connect_duration < reconnect_time_threshold:
-                reconnect_count_too_fast += 1
-                reconnect_tries_left -= 1
-                reconnect_in_seq = True
-                logger.warning("reconnected to Kubernetes-API within %.5f seconds, which might indicate a problem - reconnect tries left: %d" % (connect_duration, reconnect_tries_left))
+            if connect_failed:
+                reconnect_breaker.failure()
+                delay = reconnect_backoff.next_delay()
+                logger.warning("reconnecting to Kubernetes-API in %.1f seconds - %d failure(s) in sequence", delay, reconnect_breaker.failures)
+                time.sleep(delay)
             else:
-                reconnect_in_seq = False
-                logger.info("reconnected to Kubernetes-API")
-            # endif
-            
-            if reconnect_tries_left <= 0:
-                logger.error("reconnected too often, too fast in sequence which might indicate a problem. Restarting...")
-                sys.exit(1)
-            
-            # if there was a successful reconnect in between, the recconnect_tries_left variable gets reset to the initial value
-            if not reconnect_in_seq:
-                if reconnect_count_too_fast > 0:
-                    reconnect_count_too_fast = 0
-                    reconnect_tries_left = reconnect_max_tries
-                    logger.info("resetting reconnect-tries - reconnect tries left: %d" % reconnect_tries_left)
-                # endif
+                reconnect_breaker.success()
+                reconnect_backoff.reset()
+                logger.info("reconnecting to Kubernetes-API")
             # endif
         # endwhile
     except Exception as e:
-        logger.error("Exception-Type: %s, Message: %s" % (type(e).__name__, e))
+        logger.error("Exception-Type: %s, Message: %s", type(e).__name__, e)
         sys.exit(1)
     # endtry
 # endif
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Prerequisites
+# non-standard Python modules - Cplogging
+
+# Info
+# Retry helpers for connections to the Kubernetes-API.
+# Backoff hands out exponentially growing delays (base * 2^attempt, capped)
+# with "full jitter" - the delay is a random value between 0 and that - so
+# replicas and watches failing at the same moment do not retry in lockstep.
+# With equal_jitter the delay is at least half of that - for rate-limiting,
+# where a delay close to 0 must not happen after many attempts.
+# CircuitBreaker counts consecutive failures. After failure_threshold failures
+# it opens and no attempt is made for open_seconds - then one attempt is let
+# through (half-open), which closes it again on success.
+
+# Usage
+#     from lib.backoff import Backoff, CircuitBreaker
+#
+#     backoff = Backoff(base_seconds=0.5, max_seconds=60)
+#     breaker = CircuitBreaker("pods", failure_threshold=5, open_seconds=120)
+#     while True:
+#         breaker.wait()
+#         try:
+#             connect()
+#             breaker.success()
+#             backoff.reset()
+#         except Exception:
+#             breaker.failure()
+#             time.sleep(backoff.next_delay())
+
+# Changelog:
+#
+# 2026-10-17 -- initial release
+
+import random
+import threading
+import time
+from .cplogging import Cplogging
+from . import metrics
+
+breaker_state = metrics.Gauge("kube_vip_watcher_circuit_breaker_open", "1 if the circuit breaker is open or half-open - no or only one attempt is made", ["breaker"])
+breaker_trips = metrics.Counter("kube_vip_watcher_circuit_breaker_trips_total", "Times the circuit breaker opened after too many consecutive failures", ["breaker"])
+
+
+class Backoff(object):
+    def __init__(self, base_seconds=0.5, max_seconds=60, equal_jitter=False):
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.equal_jitter = equal_jitter
+        self.attempt = 0
+    # enddef
+
+    def next_delay(self):
+        # full jitter - random between 0 and the exponential delay of this attempt, equal jitter - between half of it and it
+        delay = min(self.max_seconds, self.base_seconds * 2 ** min(self.attempt, 32))
+        self.attempt += 1
+        if self.equal_jitter:
+            return delay / 2 + random.uniform(0, delay / 2)
+        # endif
+        return random.uniform(0, delay)
+    # enddef
+
+    def reset(self):
+        self.attempt = 0
+    # enddef
+# endclass
+
+
+class CircuitBreaker(object):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, failure_threshold=5, open_seconds=120):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+
+        # we create a log handler
+        self.logger_name = str(__name__)
+        self.logger = Cplogging(self.logger_name)
+
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = None
+        breaker_state.set(0, breaker=name)
+    # enddef
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.logger.warning("Circuit breaker %s: %s -> %s after %d consecutive failure(s)", self.name, self.state, state, self.failures)
+            self.state = state
+            breaker_state.set(0 if state == self.CLOSED else 1, breaker=self.name)
+        # endif
+    # enddef
+
+    def wait(self):
+        # blocks while the breaker is open - afterwards one attempt may be made
+        with self._lock:
+            if self.state != self.OPEN:
+                return
+            # endif
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+        # endwith
+        if remaining > 0:
+            time.sleep(remaining)
+        # endif
+        with self._lock:
+            self._set_state(self.HALF_OPEN)
+        # endwith
+    # enddef
+
+    def success(self):
+        with self._lock:
+            self._set_state(self.CLOSED)
+            self.failures = 0
+        # endwith
+    # enddef
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    breaker_trips.inc(breaker=self.name)
+                # endif
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+            # endif
+        # endwith
+    # enddef
+# endclass
@@ -18,6 +18,7 @@
 
 # Prerequisites
 # non-standard Python modules - coloredlogs (pip install coloredlogs)
+# optional - orjson (pip install orjson) makes writing JSON log-lines faster
 
 # Usage
 # Create a subfolder e.g. lib and copy the __init__.py, settings.py and
@@ -41,6 +42,22 @@
 #     # for example if you want to explicitly debug a function/method
 #     logger = Cplogging(logger_name)
 #     logger.info("info test")
+#
+# Like with the logging module, arguments are only merged into the message if the
+# record is really written - and key/value fields can be added:
+#     logger.info("Service: %s - balanced", service_name, node=node_name)
+#
+# If a log format is set to "json", every record is written as one JSON-object
+# ("Elastic Common Schema" compatible). Fields and the log context are added as
+# top-level keys - the context is set for all log-lines of a block (of the same
+# thread) and is not added to string formatted log-lines:
+#     with Cplogging.context(namespace="default", service="echoserver"):
+#         logger.info("balancing")
+
+# By default the logging call itself only puts the record into a queue - the
+# console-, file- and syslog-handlers are called by a background thread. Before
+# ending the process with os._exit() call Cplogging.flush_handlers(), else
+# records still waiting in the queue are lost (sys.exit() flushes on its own).
 
 # Example
 # log output:
@@ -50,15 +67,35 @@
 #
 # 2018-02-01 -- initial release
 # 2021-04-28 -- added "class MyFormatter" so log-timestamps with real ISO8601 timeformat can be created
+# 2026-10-17 -- the logger of the caller is looked up via sys._getframe() instead of inspect.stack() and cached
+# 2026-10-17 -- the handlers of a logger are only installed once per logger name (and again if its settings change)
+#               instead of on every initialization, "disabled" log-files no longer open /dev/null
+# 2026-10-17 -- info(), debug(), ... take "%"-args and key/value fields, which are only formatted when a record is written
+# 2026-10-17 -- a format "json" writes each record as one JSON-object - fields and the log context are top-level keys
+# 2026-10-17 -- log records are only queued by the logging thread - a background thread hands them in batches to the
+#               handlers (see global_log_queue_* in settings.py)
 
 import logging
 import logging.handlers
 import coloredlogs
+import json
 #from . import settings
 import lib.settings as settings
-import inspect
+import lib.metrics as metrics
+import atexit
+import collections
+import contextlib
+import contextvars
+import socket
+import sys
+import threading
 import time
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # copied from https://stackoverflow.com/a/48212344
 class MyFormatter(logging.Formatter):
@@ -77,6 +114,200 @@ class MyFormatter(logging.Formatter):
         return s
 
 
+class JsonFormatter(MyFormatter):
+    # serializes the whole record in one pass - the message is a JSON-string, so quotes or newlines can't break the
+    # log-line like with a JSON-template containing %(message)s
+    def __init__(self):
+        MyFormatter.__init__(self, datefmt="%Y-%m-%dT%H:%M:%S.%F%z")
+        self.host_name = socket.gethostname()
+        self.process_name = settings.global_process_name
+
+    def format(self, record):
+        msg = record.msg
+        if isinstance(msg, StructuredMessage):
+            # the fields get their own keys
+            msg = msg.message()
+        else:
+            msg = str(msg)
+            if record.args:
+                msg = msg % record.args
+        entry = {
+            "@timstamp": self.formatTime(record, self.datefmt),
+            "host": {"name": self.host_name},
+            "process": {"name": self.process_name, "id": str(record.process), "module": record.name},
+            "log": {"level": record.levelname},
+            "message": msg,
+        }
+        if record.exc_info:
+            entry["error"] = {"stack_trace": self.formatException(record.exc_info)}
+        for key, value in getattr(record, "context", {}).items():
+            entry.setdefault(key, value)
+        for key, value in getattr(record, "fields", {}).items():
+            entry.setdefault(key, value)
+
+        # objects JSON does not know are written as their string
+        if orjson is not None:
+            return orjson.dumps(entry, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        return json.dumps(entry, default=str)
+
+
+def get_formatter(fmt):
+    if fmt == "json":
+        return JsonFormatter()
+    # Here we use our own formatter to get a nice ISO8601 timestamp
+    return MyFormatter(fmt, datefmt="%Y-%m-%dT%H:%M:%S.%F%z")
+
+
+# fields added to every record logged within a "with Cplogging.context(...)" block
+_context = contextvars.ContextVar("cplogging_context", default={})
+
+
+class StructuredMessage(object):
+    # the message of a record logged with key/value fields - like with "%"-args it is only built when the record is
+    # written, e.g.
+    #     logger.debug("Service: %s - services found", service_name, services=list_of_services)
+    # results in "Service: echoserver - services found - services: [...]"
+    __slots__ = ("msg", "args", "fields")
+
+    def __init__(self, msg, args, fields):
+        self.msg = msg
+        self.args = args
+        self.fields = fields
+
+    def message(self):
+        msg = str(self.msg)
+        if self.args:
+            msg = msg % self.args
+        return msg
+
+    def __str__(self):
+        msg = self.message()
+        # each value in one line, which is easier to parse by log-pattern analyzers
+        return msg + "".join(" - %s: %s" % (key, str(value).replace("\n", "")) for key, value in self.fields.items())
+
+
+# logger_name -> logging.Logger - saves the lock taken by every logging.getLogger() call
+_loggers = {}
+# logger_name -> settings the handlers of the logger were installed with
+_configured = {}
+_loggers_lock = threading.RLock()
+
+log_handlers = metrics.Gauge("kube_vip_watcher_log_handlers", "Log handlers installed by Cplogging", ["logger"])
+log_records_dropped = metrics.Counter("kube_vip_watcher_log_records_dropped_total", "Log records dropped because the log queue was full")
+
+
+class BatchFileHandler(logging.FileHandler):
+    # the LogPipeline flushes the file once per batch instead of once per record
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        logging.FileHandler.flush(self)
+
+
+class LogPipeline(object):
+    # one background thread hands the records of all loggers to their handlers - so a slow disk or syslog-server
+    # only delays this thread and not the one that logged
+    def __init__(self, maxsize=0, overflow="drop-oldest", batch_size=100):
+        # 0 means unlimited
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.batch_size = batch_size
+
+        self._cond = threading.Condition()
+        # (list of handlers, record) in the order they were logged
+        self._records = collections.deque()
+        self._busy = False
+
+        thread = threading.Thread(target=self._run, name="cplogging")
+        thread.daemon = True
+        thread.start()
+
+    def put(self, handlers, record):
+        with self._cond:
+            if self.maxsize > 0 and len(self._records) >= self.maxsize:
+                if self.overflow == "block":
+                    while len(self._records) >= self.maxsize:
+                        self._cond.wait()
+                else:
+                    self._records.popleft()
+                    log_records_dropped.inc()
+            self._records.append((handlers, record))
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._records:
+                    self._busy = False
+                    self._cond.notify_all()
+                    self._cond.wait()
+                self._busy = True
+                batch = [self._records.popleft() for i in range(min(len(self._records), self.batch_size))]
+                # wake up threads waiting for free space
+                self._cond.notify_all()
+
+            used_handlers = set()
+            for handlers, record in batch:
+                for handler in handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+                        used_handlers.add(handler)
+            for handler in used_handlers:
+                if isinstance(handler, BatchFileHandler):
+                    handler.flush_batch()
+
+    def flush(self, timeout=None):
+        # waits until all queued records are written - returns False if the timeout expired before
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._records and not self._busy, timeout)
+
+
+class QueuedHandler(logging.Handler):
+    # takes the place of the real handlers of a logger - the calling thread only puts the record into the queue
+    def __init__(self, pipeline, handlers):
+        logging.Handler.__init__(self)
+        self.pipeline = pipeline
+        self.handlers = handlers
+
+    def emit(self, record):
+        self.pipeline.put(self.handlers, record)
+
+    def close(self):
+        # records of this logger which are still queued must be written before the handlers are closed
+        self.pipeline.flush()
+        for handler in self.handlers:
+            handler.close()
+        logging.Handler.close(self)
+
+
+# created with the first logger if global_log_queue_enable is set
+_pipeline = None
+
+
+def get_pipeline():
+    global _pipeline
+    with _loggers_lock:
+        if _pipeline is None:
+            _pipeline = LogPipeline(maxsize=settings.global_log_queue_size, overflow=settings.global_log_queue_overflow)
+            atexit.register(_pipeline.flush, 5)
+        return _pipeline
+
+
+def get_logger(logger_name):
+    try:
+        return _loggers[logger_name]
+    except KeyError:
+        with _loggers_lock:
+            return _loggers.setdefault(logger_name, logging.getLogger(logger_name))
+
+
+def remove_handlers(logger):
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+
+
 class Cplogging(object):
     def __init__(self, logger_name, log_level=None, log_file_path=None):
         self.logger_name = logger_name
@@ -97,8 +328,7 @@ class Cplogging(object):
                 log_file_path = global_log_file_path
 
         if log_file_path == "disabled":
-            # TODO: find a nicer option to disable writting a file
-            log_file_path = "/dev/null"
+            log_file_path = None
 
         if global_log_level != log_level:
             if log_level is None:
@@ -111,83 +341,128 @@ class Cplogging(object):
             log_level = "info"
 
         global logger
-        logger = logging.getLogger(logger_name)
-        # coloredlogs supports normal ISO8601 format and strftime variables
-        coloredlogs.install(level=log_level, logger=logger, fmt=global_log_format, datefmt="%Y-%m-%dT%H:%M:%S.%f%z")
-        if global_log_file_path is not None or log_file_path is not None:
-            logfile_writer = logging.FileHandler(log_file_path)
+        logger = get_logger(logger_name)
+        self._logger = logger
+
+        # Cplogging is initialized in every function call - the handlers are only installed the first time (or if
+        # the settings changed in the meantime), else every call would add another file- and syslog-handler
+        log_settings = (log_level, log_file_path, global_log_format, global_log_file_format,
+                        global_log_server_enable, global_log_server, global_log_server_format,
+                        settings.global_log_queue_enable)
+        with _loggers_lock:
+            if _configured.get(logger_name) == log_settings:
+                return
+            if logger_name in _configured:
+                remove_handlers(logger)
+            _configured[logger_name] = log_settings
+            self._install_handlers(logger, log_level, log_file_path)
+            handler_count = len(logger.handlers)
+            if settings.global_log_queue_enable:
+                # the handlers are moved behind the queue
+                handlers = logger.handlers[:]
+                for handler in handlers:
+                    logger.removeHandler(handler)
+                logger.addHandler(QueuedHandler(get_pipeline(), handlers))
+            log_handlers.set(handler_count, logger=logger_name)
+
+    def _install_handlers(self, logger, log_level, log_file_path):
+        global_log_level = settings.global_log_level
+        global_log_format = settings.global_log_format
+        global_log_file_format = settings.global_log_file_format
+        global_log_server_enable = settings.global_log_server_enable
+        global_log_server = settings.global_log_server
+        global_log_server_format = settings.global_log_server_format
+
+        if global_log_format == "json":
+            # written to stderr like coloredlogs does - but without the coloring, it would only break the JSON
+            console_writer = logging.StreamHandler()
+            console_writer.setLevel(coloredlogs.level_to_number(log_level))
+            console_writer.setFormatter(JsonFormatter())
+            coloredlogs.adjust_level(logger, log_level)
+            logger.addHandler(console_writer)
+        else:
+            # coloredlogs supports normal ISO8601 format and strftime variables
+            coloredlogs.install(level=log_level, logger=logger, fmt=global_log_format, datefmt="%Y-%m-%dT%H:%M:%S.%f%z")
+        if log_file_path is not None:
+            if settings.global_log_queue_enable:
+                logfile_writer = BatchFileHandler(log_file_path)
+            else:
+                logfile_writer = logging.FileHandler(log_file_path)
             logger.addHandler(logfile_writer)
             # logfile_writer.setFormatter(logging.Formatter(global_log_file_format, datefmt="%Y-%m-%dT%H:%M:%S.%F%z"))
-            # Here we use our own formatter to get a nice ISO8601 timestamp
-            logfile_writer.setFormatter(MyFormatter(global_log_file_format, datefmt="%Y-%m-%dT%H:%M:%S.%F%z"))
+            logfile_writer.setFormatter(get_formatter(global_log_file_format))
 
         # if in the settings sending logs to a syslog server is enabled and a server is set
         # we attach a syslogger handler to the logging stuff
         if global_log_server_enable:
-            syslogger = logging.getLogger(logger_name)
+            syslogger = logger
             syslogger.setLevel(getattr(logging, global_log_level.upper()))
             handler = logging.handlers.SysLogHandler(address=global_log_server)
             # formatter = logging.Formatter(fmt=global_log_server_format, datefmt="%Y-%m-%dT%H:%M:%S.%F%z")
-            # Here we use the our own formatter to get a nice ISO8601 timestamp
-            formatter = MyFormatter(global_log_server_format, datefmt="%Y-%m-%dT%H:%M:%S.%F%z")
-            handler.setFormatter(formatter)
+            handler.setFormatter(get_formatter(global_log_server_format))
             syslogger.addHandler(handler)
 
-    # for the following methods we inspect from where the method is called thanks to:
-    # https://stackoverflow.com/questions/17065086/how-to-get-the-caller-class-name-inside-a-function-of-another-class-in-python
-    # then we shadow the logger variable to write to the correct logging handler
-    # @staticmethod
-    def info(self, msg):
-        stack = inspect.stack()
-        # print(stack[1][0].f_locals)
-        try:
-            logger_name = stack[1][0].f_locals['logger_name']
-        except KeyError:
-            logger_name = self.logger_name
-        logger = logging.getLogger(logger_name)
-        logger.info(msg)
-
-    # @staticmethod
-    def warning(self, msg):
-        stack = inspect.stack()
-        try:
-            logger_name = stack[1][0].f_locals['logger_name']
-        except KeyError:
-            logger_name = self.logger_name
-        logger = logging.getLogger(logger_name)
-        logger.warning(msg)
-
-    # @staticmethod
-    def debug(self, msg):
-        stack = inspect.stack()
-        try:
-            logger_name = stack[1][0].f_locals['logger_name']
-        except KeyError:
-            logger_name = self.logger_name
-        logger = logging.getLogger(logger_name)
-        logger.debug(msg)
-
-    # @staticmethod
-    def error(self, msg):
-        stack = inspect.stack()
-        try:
-            logger_name = stack[1][0].f_locals['logger_name']
-        except KeyError:
-            logger_name = self.logger_name
-        logger = logging.getLogger(logger_name)
-        logger.error(msg)
-
-    # @staticmethod
-    def critical(self, msg):
-        stack = inspect.stack()
+    # for the following methods we look up from where the method is called - if the caller has a local variable
+    # 'logger_name' we shadow the logger variable to write to the correct logging handler, else our own logger is used.
+    # inspect.stack() was used for this once, but it reads the source lines of the whole call stack on every call -
+    # sys._getframe() only returns the frame itself and the variable names of a function are known without
+    # building its locals, so the common case costs a few attribute lookups
+    def _log(self, level, msg, args, fields):
+        # frame 0 is this method, frame 1 info()/warning()/..., frame 2 the caller
+        frame = sys._getframe(2)
+        code = frame.f_code
+        logger = self._logger
+        if "logger_name" in code.co_varnames or "logger_name" in code.co_cellvars:
+            logger_name = frame.f_locals.get("logger_name", self.logger_name)
+            if logger_name != self.logger_name:
+                logger = get_logger(logger_name)
+        # nothing is formatted if the level is disabled - and else only when a handler writes the record
+        if not logger.isEnabledFor(level):
+            return
+        # stacklevel 3 - funcName and lineno of the record are the ones of the caller
+        extra = {"context": _context.get()}
+        if fields:
+            extra["fields"] = fields
+            logger.log(level, StructuredMessage(msg, args, fields), stacklevel=3, extra=extra)
+        else:
+            logger.log(level, msg, *args, stacklevel=3, extra=extra)
+
+    def info(self, msg, *args, **fields):
+        self._log(logging.INFO, msg, args, fields)
+
+    def warning(self, msg, *args, **fields):
+        self._log(logging.WARNING, msg, args, fields)
+
+    def debug(self, msg, *args, **fields):
+        self._log(logging.DEBUG, msg, args, fields)
+
+    def error(self, msg, *args, **fields):
+        self._log(logging.ERROR, msg, args, fields)
+
+    def critical(self, msg, *args, **fields):
+        self._log(logging.CRITICAL, msg, args, fields)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def context(**fields):
+        # nested blocks add their fields to the ones of the outer blocks
+        token = _context.set(dict(_context.get(), **fields))
         try:
-            logger_name = stack[1][0].f_locals['logger_name']
-        except KeyError:
-            logger_name = self.logger_name
-        logger = logging.getLogger(logger_name)
-        logger.critical(msg)
+            yield
+        finally:
+            _context.reset(token)
+
+    @staticmethod
+    def flush_handlers(timeout=5):
+        # writes all queued log records - needed before os._exit() as it skips the atexit-handlers
+        if _pipeline is not None:
+            return _pipeline.flush(timeout)
+        return True
 
     @staticmethod
     def destroy_handler():
-        for handler in logger.handlers[:]:
-            logger.removeHandler(handler)
+        with _loggers_lock:
+            remove_handlers(logger)
+            # the next initialization installs the handlers again
+            _configured.pop(logger.name, None)
+            log_handlers.set(0, logger=logger.name)
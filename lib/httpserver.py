@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Prerequisites
+# non-standard Python modules - Cplogging
+
+# Info
+# A tiny HTTP-server running in a background thread - e.g. for the /metrics
+# endpoint scraped by Prometheus. Every path is served by a function returning
+# (HTTP-status, content-type, body).
+
+# Usage
+#     from lib import metrics
+#     from lib.httpserver import HttpServer
+#
+#     http_server = HttpServer(8080)
+#     http_server.add_route("/metrics", lambda: (200, "text/plain; version=0.0.4; charset=utf-8", metrics.exposition()))
+#     http_server.start()
+
+# Changelog:
+#
+# 2026-10-17 -- initial release
+
+import http.server
+import threading
+from .cplogging import Cplogging
+
+
+class HttpServer(object):
+    def __init__(self, port, address=""):
+        self.port = port
+        self.address = address
+        # path -> function returning (status, content-type, body)
+        self.routes = {}
+
+        # we create a log handler
+        self.logger_name = str(__name__)
+        self.logger = Cplogging(self.logger_name)
+    # enddef
+
+    def add_route(self, path, func):
+        self.routes[path] = func
+    # enddef
+
+    def _request_handler(self):
+        server = self
+
+        class RequestHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                func = server.routes.get(self.path.split("?", 1)[0])
+                if func is None:
+                    status, content_type, body = 404, "text/plain; charset=utf-8", "not found\n"
+                else:
+                    try:
+                        status, content_type, body = func()
+                    except Exception as e:
+                        server.logger.error("HTTP-server: %s failed - Exception-Type: %s, Message: %s", self.path, type(e).__name__, e)
+                        status, content_type, body = 500, "text/plain; charset=utf-8", "internal error\n"
+                    # endtry
+                # endif
+                body = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            # enddef
+
+            def log_message(self, format, *args):
+                # scrapes and probes every few seconds would flood the log
+                server.logger.debug("HTTP-server: " + format, *args)
+            # enddef
+        # endclass
+
+        return RequestHandler
+    # enddef
+
+    def start(self):
+        httpd = http.server.ThreadingHTTPServer((self.address, self.port), self._request_handler())
+        httpd.daemon_threads = True
+        thread = threading.Thread(target=httpd.serve_forever, name="http-server")
+        thread.daemon = True
+        thread.start()
+        self.logger.info("HTTP-server listening on port %d - paths: %s", self.port, ", ".join(sorted(self.routes)))
+        return httpd
+    # enddef
+# endclass
@@ -0,0 +1,686 @@
+#!/usr/bin/env python
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Prerequisites
+# non-standard Python modules - kubernetes, Cplogging
+
+# Info
+# This module keeps an in-memory copy of Kubernetes objects, similar to the
+# informers known from client-go. The objects are listed once and then kept
+# up to date by a watch. Besides the store itself (keyed by "namespace/name")
+# any number of indexes can be defined, so lookups like "all services with
+# app-label X in namespace Y" are dictionary reads instead of LIST calls
+# against the Kubernetes-API.
+
+# Usage
+#     from lib.informer import Informer
+#
+#     def index_service_by_app(service):
+#         # an indexer returns a list of index values for an object
+#         return [(service.metadata.namespace, service.metadata.labels['app'])]
+#
+#     service_informer = Informer("services", v1_core.list_service_for_all_namespaces,
+#                                 indexers={"app": index_service_by_app})
+#     # list and watch in a background thread
+#     service_informer.start()
+#     service_informer.wait_for_sync()
+#     services = service_informer.by_index("app", ("default", "echoserver"))
+#
+# A transform function can reduce the objects to what is really needed before
+# they are stored - e.g. parsed annotations instead of the whole API-object.
+#
+# If the events are needed too, the stream() generator can be iterated instead
+# of calling start(). The store is always updated before an event is handed out.
+# stream() returns after timeout_seconds - calling it again resumes the watch
+# from the last seen resourceVersion (kept current by watch bookmarks), so only
+# the very first call and an expired resourceVersion (410 Gone) list everything.
+# prime() does that first list without handing out events.
+#
+# Selectors are passed through to the list and watch calls, so the filtering is
+# done by the Kubernetes-API. To restrict an informer to a few namespaces, also
+# pass the namespaced list-function - each namespace is then watched on its own:
+#     pod_informer = Informer("pods", v1_core.list_pod_for_all_namespaces,
+#                             namespaced_list_func=v1_core.list_namespaced_pod,
+#                             namespaces=["default", "logging"],
+#                             label_selector="kube-vip-watcher/balance=true")
+#
+# The namespaces can be changed while the informer runs with set_namespaces() -
+# objects of removed namespaces are dropped from the store, added namespaces are
+# listed and watched right away.
+#
+# Every namespace watched on its own costs a connection and a thread. With more
+# namespaces than max_namespace_watches a single cluster-wide watch is used
+# instead and the objects of other namespaces are dropped by the informer - the
+# Kubernetes-API then sends the objects of all namespaces, and adding namespaces
+# with set_namespaces() lists all namespaces again.
+
+# Changelog:
+#
+# 2026-10-17 -- initial release
+
+import concurrent.futures
+import json
+import queue
+import threading
+import time
+from kubernetes import client, watch
+from .cplogging import Cplogging
+from .backoff import Backoff
+from . import metrics
+
+try:
+    # optional - parses the raw JSON of decode-informers faster
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+# endtry
+
+# events of all namespaces waiting for stream() - if it is not read, the watches wait too instead of filling the memory
+MERGE_QUEUE_SIZE = 1000
+
+relists = metrics.Counter("kube_vip_watcher_informer_relists_total", "Full lists made by an informer - the first start and after an expired resourceVersion", ["informer"])
+watch_reconnects = metrics.Counter("kube_vip_watcher_watch_reconnects_total", "Watches resumed from the last seen resourceVersion", ["informer"])
+
+
+class Informer(object):
+    def __init__(self, name, list_func, namespaced_list_func=None, namespaces=None, indexers=None, object_filter=None, transform=None, decode=None, max_namespace_watches=None, **list_kwargs):
+        self.name = name
+        self.list_func = list_func
+        self.namespaced_list_func = namespaced_list_func
+        # None stands for "all namespaces"
+        self.namespaces = list(namespaces) if namespaces else [None]
+        self._namespace_set = set(self.namespaces)
+        # None or 0 means no limit
+        self.max_namespace_watches = max_namespace_watches
+        self.indexers = indexers or {}
+        # objects for which object_filter returns False are not kept in the store and their events are dropped
+        self.object_filter = object_filter
+        # if set, the store holds transform(obj) instead of the object itself - the indexers get the transformed objects
+        self.transform = transform
+        # if set, lists and watches are read as raw JSON and decode(dict) builds the object - no model objects are created.
+        # The decoded objects need "namespace" and "name" attributes (or a "metadata" holding them)
+        self.decode = decode
+        self.list_kwargs = list_kwargs
+        self.event_handlers = []
+
+        # we create a log handler
+        self.logger_name = str(__name__)
+        self.logger = Cplogging(self.logger_name)
+
+        self._lock = threading.RLock()
+        self._items = {}
+        self._indices = dict((index_name, {}) for index_name in self.indexers)
+        self._synced = threading.Event()
+        # last seen resourceVersion per namespace - a reconnect resumes from there instead of listing again
+        self._resource_versions = {}
+        # time.monotonic() of the last list, event or bookmark - a watch that stays silent for too long is stuck
+        self._last_activity = None
+        # bumped if set_namespaces() removes a namespace - events of its old watch are dropped from then on
+        self._generations = {}
+        # event queues of running streams, so set_namespaces() can wake them up
+        self._source_queues = set()
+    # enddef
+
+    @staticmethod
+    def key(obj):
+        metadata = getattr(obj, "metadata", obj)
+        if metadata.namespace:
+            return "%s/%s" % (metadata.namespace, metadata.name)
+        else:
+            return metadata.name
+        # endif
+    # enddef
+
+    @staticmethod
+    def resource_version(obj):
+        return getattr(getattr(obj, "metadata", obj), "resource_version", None)
+    # enddef
+
+    def _is_outdated(self, obj):
+        # resourceVersions are opaque to clients, but the Kubernetes-API hands out increasing numbers - an object older
+        # than the stored one (e.g. a watch event still in flight while a newer patch response was written through) is
+        # dropped. Objects without a numeric resourceVersion are always taken
+        new_version = self.resource_version(obj)
+        old_version = self.resource_version(self._items.get(self.key(obj)))
+        if new_version is None or old_version is None or not str(new_version).isdigit() or not str(old_version).isdigit():
+            return False
+        # endif
+        return int(new_version) < int(old_version)
+    # enddef
+
+    def _index_values(self, index_name, obj):
+        try:
+            return self.indexers[index_name](obj)
+        except Exception:
+            # objects which cannot be indexed (e.g. missing label) are just not part of the index
+            return []
+        # endtry
+    # enddef
+
+    def _add(self, obj):
+        # returns the previously stored object and the one stored now (transformed if a transform is set)
+        key = self.key(obj)
+        if self.transform is not None:
+            obj = self.transform(obj)
+        # endif
+        return self._store(key, obj), obj
+    # enddef
+
+    def _store(self, key, obj):
+        with self._lock:
+            old_obj = self._items.get(key)
+            if old_obj is not None:
+                self._remove_from_indices(key, old_obj)
+            # endif
+            self._items[key] = obj
+            for index_name in self.indexers:
+                for value in self._index_values(index_name, obj):
+                    self._indices[index_name].setdefault(value, set()).add(key)
+                # endfor
+            # endfor
+        # endwith
+        return old_obj
+    # enddef
+
+    def _delete(self, obj):
+        return self._delete_key(self.key(obj))
+    # enddef
+
+    def _delete_key(self, key):
+        with self._lock:
+            old_obj = self._items.pop(key, None)
+            if old_obj is not None:
+                self._remove_from_indices(key, old_obj)
+            # endif
+        # endwith
+        return old_obj
+    # enddef
+
+    def _remove_from_indices(self, key, obj):
+        for index_name in self.indexers:
+            index = self._indices[index_name]
+            for value in self._index_values(index_name, obj):
+                keys = index.get(value)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[value]
+                    # endif
+                # endif
+            # endfor
+        # endfor
+    # enddef
+
+    def _replace(self, objects, namespace=None):
+        # used after a (re-)list of one namespace (None = all) - returns the objects that vanished in the meantime
+        # and the objects as stored now
+        with self._lock:
+            listed_keys = set(self.key(obj) for obj in objects)
+            removed = []
+            for key, obj in list(self._items.items()):
+                if (namespace is None or key.startswith(namespace + "/")) and key not in listed_keys:
+                    removed.append(obj)
+                    self._delete_key(key)
+                # endif
+            # endfor
+            stored = [self._add(obj)[1] for obj in objects]
+        # endwith
+        return removed, stored
+    # enddef
+
+    def _in_namespaces(self, obj):
+        # with a cluster-wide watch for a list of namespaces the objects of the other namespaces are dropped here
+        if self.namespaces == [None]:
+            return True
+        # endif
+        return getattr(obj, "metadata", obj).namespace in self._namespace_set
+    # enddef
+
+    def _wanted(self, obj):
+        return self._in_namespaces(obj) and (self.object_filter is None or self.object_filter(obj))
+    # enddef
+
+    def _sources(self):
+        # the namespaces watched on their own - or [None] for one cluster-wide watch
+        if self.namespaces == [None] or (self.max_namespace_watches and len(self.namespaces) > self.max_namespace_watches):
+            return [None]
+        # endif
+        return list(self.namespaces)
+    # enddef
+
+    def update(self, obj):
+        # write-through for objects returned by a successful patch - the store does not have to wait for the watch event
+        with self._lock:
+            if self._wanted(obj) and not self._is_outdated(obj):
+                self._add(obj)
+            # endif
+        # endwith
+    # enddef
+
+    def add_event_handler(self, handler):
+        # handler(event) is called for every event by run() - event['object'] is the object as kept in the store (so
+        # transformed if a transform is set), event['old_object'] holds the previous state for "MODIFIED"
+        self.event_handlers.append(handler)
+    # enddef
+
+    def get(self, key):
+        with self._lock:
+            return self._items.get(key)
+        # endwith
+    # enddef
+
+    def list(self):
+        with self._lock:
+            return list(self._items.values())
+        # endwith
+    # enddef
+
+    def by_index(self, index_name, value):
+        with self._lock:
+            keys = self._indices[index_name].get(value, ())
+            return [self._items[key] for key in keys]
+        # endwith
+    # enddef
+
+    def has_synced(self):
+        return self._synced.is_set()
+    # enddef
+
+    def wait_for_sync(self, timeout=None):
+        return self._synced.wait(timeout)
+    # enddef
+
+    def seconds_since_last_activity(self):
+        # None if nothing was listed yet or there is nothing to watch - a sharded informer may own no namespace at all,
+        # then no events or bookmarks can arrive
+        if self._last_activity is None or not self.namespaces:
+            return None
+        # endif
+        return time.monotonic() - self._last_activity
+    # enddef
+
+    def _list(self, namespace):
+        # returns the listed objects and the resourceVersion of the list
+        if namespace is None:
+            func, args = self.list_func, ()
+        else:
+            func, args = self.namespaced_list_func, (namespace,)
+        # endif
+        relists.inc(informer=self.name)
+        if self.decode is None:
+            object_list = func(*args, **self.list_kwargs)
+            return object_list.items, object_list.metadata.resource_version
+        # endif
+        # the response is parsed as plain JSON - only decode() picks what is needed from every item
+        response = func(*args, _preload_content=False, **self.list_kwargs)
+        try:
+            object_list = json_loads(response.data)
+        finally:
+            response.release_conn()
+        # endtry
+        return [self.decode(item) for item in object_list.get("items") or []], object_list["metadata"]["resourceVersion"]
+    # enddef
+
+    def _apply_list(self, namespace, objects, resource_version):
+        # replaces the objects of a namespace by a consistent list - the watch then continues from its resourceVersion
+        self._last_activity = time.monotonic()
+        items = [obj for obj in objects if self._wanted(obj)]
+        with self._lock:
+            if namespace not in self._sources():
+                # removed by set_namespaces() while we were listing
+                return []
+            # endif
+            removed, stored = self._replace(items, namespace)
+            self._resource_versions[namespace] = resource_version
+        # endwith
+        if all(source in self._resource_versions for source in self._sources()):
+            self._synced.set()
+        # endif
+        self.logger.info("Informer %s: listed %d objects in namespace %s at resourceVersion %s", self.name, len(items), namespace or "<all>", resource_version)
+
+        # the store is already updated, "relist" marks the events so they are not applied again
+        events = [{"type": "DELETED", "object": obj, "relist": True} for obj in removed]
+        events.extend({"type": "ADDED", "object": obj, "relist": True} for obj in stored)
+        return events
+    # enddef
+
+    def _relist(self, namespace):
+        objects, resource_version = self._list(namespace)
+        return self._apply_list(namespace, objects, resource_version)
+    # enddef
+
+    def _apply_event(self, event):
+        # updates the store - returns the event as handed out (the object as stored, so transformed if a transform is
+        # set) or None if there is nothing to hand out
+        if event['type'] in ("ADDED", "MODIFIED", "DELETED") and not self._wanted(event['object']):
+            # an object which does not (or not anymore) pass the filter is handled like a deleted one
+            old_obj = self._delete(event['object'])
+            if old_obj is None:
+                return None
+            # endif
+            return {"type": "DELETED", "object": old_obj}
+        elif event['type'] in ("ADDED", "MODIFIED"):
+            if self._is_outdated(event['object']):
+                # the store already holds a newer state of the object
+                return None
+            # endif
+            old_obj, obj = self._add(event['object'])
+            return {"type": event['type'], "object": obj, "old_object": old_obj}
+        elif event['type'] == "DELETED":
+            # an object we never stored has nothing to hand out - events always carry the object as stored
+            old_obj = self._delete(event['object'])
+            if old_obj is None:
+                return None
+            # endif
+            return {"type": "DELETED", "object": old_obj}
+        # endif
+        return None
+    # enddef
+
+    def _watch_source(self, namespace, timeout_seconds, generation=0, stopped=None):
+        # only reads from the Kubernetes-API - the store and the resourceVersion of the namespace are updated by stream(),
+        # which may run in another thread. A list is handed out as a "LIST"-event, every event carries its resourceVersion
+        resource_version = self._resource_versions.get(namespace)
+        if resource_version is None:
+            objects, resource_version = self._list(namespace)
+            yield {"type": "LIST", "objects": objects, "resource_version": resource_version}
+        else:
+            watch_reconnects.inc(informer=self.name)
+        # endif
+
+        if namespace is None:
+            func, args = self.list_func, ()
+        else:
+            func, args = self.namespaced_list_func, (namespace,)
+        # endif
+        while True:
+            try:
+                # bookmarks keep the resourceVersion current even if no object changes for a long time
+                if self.decode is None:
+                    # every namespace gets its own Watch object as it keeps track of the resourceVersion
+                    source_watch = watch.Watch()
+                    source_events = source_watch.stream(func, *args, resource_version=resource_version, allow_watch_bookmarks=True, timeout_seconds=timeout_seconds, **self.list_kwargs)
+                else:
+                    source_events = self._stream_raw(func, args, resource_version, timeout_seconds)
+                # endif
+                for event in source_events:
+                    if generation != self._generations.get(namespace, 0) or (stopped is not None and stopped.is_set()):
+                        # the namespace was removed by set_namespaces() or nobody reads our events anymore - closing
+                        # the generator closes the connection
+                        source_events.close()
+                        return
+                    # endif
+                    if self.decode is None:
+                        resource_version = source_watch.resource_version
+                    else:
+                        resource_version = event['object']['metadata']['resourceVersion']
+                        if event['type'] != "BOOKMARK":
+                            event = {"type": event['type'], "object": self.decode(event['object'])}
+                        # endif
+                    # endif
+                    event['resource_version'] = resource_version
+                    yield event
+                # endfor
+                # the server closed the watch after timeout_seconds - that is fine too
+                return
+            except client.rest.ApiException as e:
+                if e.status == 410:
+                    # resourceVersion too old - we have to list again and continue watching from there
+                    self.logger.warning("Informer %s: watch in namespace %s expired (410 Gone) - relisting", self.name, namespace or "<all>")
+                    objects, resource_version = self._list(namespace)
+                    yield {"type": "LIST", "objects": objects, "resource_version": resource_version}
+                else:
+                    raise
+                # endif
+            # endtry
+        # endwhile
+    # enddef
+
+    def _stream_raw(self, func, args, resource_version, timeout_seconds):
+        # the watch of decode-informers - the events are only parsed as JSON instead of being turned into model objects.
+        # kubernetes.watch.Watch cannot be used for this: with deserialize=False it misses "raw_object" of ERROR-events,
+        # so an expired resourceVersion raises a KeyError instead of the ApiException with status 410 we relist on
+        response = func(*args, watch=True, _preload_content=False, resource_version=resource_version, allow_watch_bookmarks=True, timeout_seconds=timeout_seconds, **self.list_kwargs)
+        try:
+            if not 200 <= response.status <= 299:
+                raise client.rest.ApiException(http_resp=response)
+            # endif
+            for line in watch.watch.iter_resp_lines(response):
+                if not line or line.isspace():
+                    continue
+                # endif
+                event = json_loads(line)
+                if event['type'] == "ERROR":
+                    status = event['object']
+                    raise client.rest.ApiException(status=status.get('code'), reason="%s: %s" % (status.get('reason'), status.get('message')))
+                # endif
+                yield event
+            # endfor
+        finally:
+            response.close()
+            response.release_conn()
+        # endtry
+    # enddef
+
+    def _watch_sources(self, timeout_seconds):
+        # yields (namespace, generation, event)
+        if self.namespaces == [None]:
+            for event in self._watch_source(None, timeout_seconds):
+                yield None, 0, event
+            # endfor
+            return
+        # endif
+
+        # namespaces are watched in parallel and their events are merged into one stream - set_namespaces() wakes
+        # us up, so watches of added namespaces are started right away
+        events = queue.Queue(maxsize=MERGE_QUEUE_SIZE)
+        # set when this stream ends (also by an exception) - the watches of the other namespaces then end too
+        stopped = threading.Event()
+        with self._lock:
+            self._source_queues.add(events)
+        # endwith
+
+        def put(item):
+            # waits while the queue is full - gives up once the stream has ended
+            while not stopped.is_set():
+                try:
+                    events.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    pass
+                # endtry
+            # endwhile
+            return False
+        # enddef
+
+        def pump(namespace, generation):
+            try:
+                for event in self._watch_source(namespace, timeout_seconds, generation, stopped):
+                    if not put(("event", namespace, generation, event)):
+                        return
+                    # endif
+                # endfor
+                put(("done", namespace, generation, None))
+            except Exception as e:
+                put(("error", namespace, generation, e))
+            # endtry
+        # enddef
+
+        started = set()
+        running = 0
+        deadline = time.monotonic() + timeout_seconds
+        try:
+            while True:
+                for namespace in self._sources():
+                    source = (namespace, self._generations.get(namespace, 0))
+                    if source not in started:
+                        started.add(source)
+                        running += 1
+                        thread = threading.Thread(target=pump, args=source, name="informer-%s-%s" % (self.name, namespace))
+                        thread.daemon = True
+                        thread.start()
+                    # endif
+                # endfor
+
+                if running == 0:
+                    if started:
+                        return
+                    # endif
+                    # nothing to watch (yet) - wait until set_namespaces() gives us something or the timeout is reached
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    # endif
+                    try:
+                        events.get(timeout=remaining)
+                    except queue.Empty:
+                        return
+                    # endtry
+                    continue
+                # endif
+
+                kind, namespace, generation, value = events.get()
+                if kind == "event":
+                    yield namespace, generation, value
+                elif kind == "done":
+                    running -= 1
+                elif kind == "error":
+                    raise value
+                # endif
+            # endwhile
+        finally:
+            stopped.set()
+            with self._lock:
+                self._source_queues.discard(events)
+            # endwith
+        # endtry
+    # enddef
+
+    def set_namespaces(self, namespaces):
+        # changes the watched namespaces of a running informer (used for sharding) - the objects of removed namespaces
+        # are dropped from the store without events, added namespaces are listed (with "relist" events) and watched
+        if self.namespaced_list_func is None:
+            raise ValueError("Informer %s: set_namespaces() needs a namespaced_list_func" % self.name)
+        # endif
+        namespaces = sorted(set(namespaces))
+        with self._lock:
+            old_sources = self._sources()
+            added = set(namespaces) - set(self.namespaces)
+            for namespace in self.namespaces:
+                if namespace not in namespaces:
+                    self._replace([], namespace)
+                # endif
+            # endfor
+            self.namespaces = namespaces
+            self._namespace_set = set(namespaces)
+            sources = self._sources()
+            for source in old_sources:
+                # the watch of a removed namespace - or the cluster-wide watch, which has to list the added namespaces
+                if source not in sources or (source is None and added):
+                    self._generations[source] = self._generations.get(source, 0) + 1
+                    self._resource_versions.pop(source, None)
+                # endif
+            # endfor
+            # the clock of added namespaces starts now and not with the last event of the namespaces before
+            self._last_activity = time.monotonic()
+            # wait_for_sync() waits for the added namespaces to be listed
+            if all(source in self._resource_versions for source in sources):
+                self._synced.set()
+            else:
+                self._synced.clear()
+            # endif
+            for events in self._source_queues:
+                try:
+                    events.put_nowait(("wake", None, None, None))
+                except queue.Full:
+                    # the stream has events to read anyway and looks at the namespaces again after each of them
+                    pass
+                # endtry
+            # endfor
+        # endwith
+        if sources == [None]:
+            self.logger.info("Informer %s: watching %d namespaces with one cluster-wide watch", self.name, len(namespaces))
+        else:
+            self.logger.info("Informer %s: watching %d namespaces", self.name, len(namespaces))
+        # endif
+    # enddef
+
+    def prime(self, workers=8):
+        # lists every namespace not listed yet without handing out events - the next stream() only watches from the
+        # listed resourceVersions. Used at startup, where the whole store is reconciled once instead of event by event
+        namespaces = [namespace for namespace in self._sources() if namespace not in self._resource_versions]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(workers, len(namespaces))), thread_name_prefix="informer-" + self.name) as executor:
+            for _ in executor.map(self._relist, namespaces):
+                pass
+            # endfor
+        # endwith
+    # enddef
+
+    def stream(self, timeout_seconds=1800):
+        # only the first call (or a 410 Gone) lists - afterwards the watch resumes from the last seen resourceVersion
+        for namespace, generation, event in self._watch_sources(timeout_seconds):
+            # the clock of the liveness check runs where the events are consumed - so a stuck consumer stops it too,
+            # not only a stuck watch
+            self._last_activity = time.monotonic()
+            with self._lock:
+                if generation != self._generations.get(namespace, 0) or namespace not in self._sources():
+                    # events of namespaces given up in the meantime are dropped
+                    continue
+                # endif
+                if event['type'] == "LIST":
+                    out_events = self._apply_list(namespace, event['objects'], event['resource_version'])
+                else:
+                    out_event = self._apply_event(event)
+                    out_events = [out_event] if out_event is not None else []
+                    # only recorded once the event is in the store - a watch failing before resumes from here and
+                    # gets the event again
+                    self._resource_versions[namespace] = event['resource_version']
+                # endif
+            # endwith
+            for out_event in out_events:
+                yield out_event
+            # endfor
+        # endfor
+        # the server closed the watch after timeout_seconds - that is fine too
+        self._last_activity = time.monotonic()
+    # enddef
+
+    def run(self):
+        # keeps the store up to date forever - used by start() in a background thread
+        # failed connections are retried with a jittered exponential backoff, the store is kept meanwhile
+        backoff = Backoff(max_seconds=30)
+        while True:
+            try:
+                for event in self.stream():
+                    backoff.reset()
+                    for handler in self.event_handlers:
+                        handler(event)
+                    # endfor
+                # endfor
+                backoff.reset()
+            except Exception as e:
+                delay = backoff.next_delay()
+                self.logger.error("Informer %s: Exception-Type: %s, Message: %s - retrying in %.1f seconds", self.name, type(e).__name__, e, delay)
+                time.sleep(delay)
+            # endtry
+        # endwhile
+    # enddef
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="informer-" + self.name)
+        thread.daemon = True
+        thread.start()
+        return thread
+    # enddef
+# endclass
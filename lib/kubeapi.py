@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Prerequisites
+# non-standard Python modules - kubernetes
+
+# Info
+# Helpers around the Kubernetes-API clients. CountingApi wraps e.g. a CoreV1Api
+# and counts every call by verb and resource, so the load the watcher puts on
+# the Kubernetes-API can be seen in the metrics. Calls with watch=True (as made
+# by kubernetes.watch.Watch) are counted with verb "watch".
+# Optionally every call gets a (connect, read) timeout by its class - "read",
+# "list", "watch" or "write" (patch, replace, create, delete) - unless the caller
+# passes _request_timeout itself. Calls (except watches) failing on the
+# connection, e.g. a timeout, are retried with a jittered backoff.
+# new_api_client() creates an ApiClient with its own connection pool size and
+# TCP keep-alive, so a dead connection of a long-running watch is noticed.
+
+# Usage
+#     from kubernetes import client
+#     from lib.kubeapi import CountingApi, new_api_client
+#
+#     v1_core = CountingApi(client.CoreV1Api())
+#     v1_core.list_namespaced_pod("default")
+#     # kube_vip_watcher_api_calls_total{verb="list",resource="namespaced_pod"} 1
+#
+#     api_client = new_api_client(pool_maxsize=32, tcp_keepalive=True)
+#     v1_core = CountingApi(client.CoreV1Api(api_client), timeouts={"read": (5, 10), "list": (5, 60), "watch": (5, 300), "write": (5, 10)}, retries=2)
+
+# Changelog:
+#
+# 2026-10-17 -- initial release
+
+import functools
+import time
+import urllib3
+from kubernetes import client
+from kubernetes.utils.keepalive import tcp_keepalive_socket_options
+from .backoff import Backoff
+from . import metrics
+
+api_calls = metrics.Counter("kube_vip_watcher_api_calls_total", "Calls to the Kubernetes-API", ["verb", "resource"])
+api_errors = metrics.Counter("kube_vip_watcher_api_errors_total", "Calls to the Kubernetes-API which raised an exception", ["verb", "resource"])
+
+
+api_retries = metrics.Counter("kube_vip_watcher_api_retries_total", "Calls to the Kubernetes-API retried after a connection error or timeout", ["verb", "resource"])
+
+
+def new_api_client(pool_maxsize=None, tcp_keepalive=True):
+    # based on the default configuration as set up by config.load_incluster_config()
+    configuration = client.Configuration.get_default_copy()
+    if pool_maxsize:
+        # all threads calling the API at the same time (and every running watch) need a connection of their own
+        configuration.connection_pool_maxsize = pool_maxsize
+    # endif
+    if tcp_keepalive:
+        # a watch waits for data for a long time - keep-alive probes notice a connection dropped on the way
+        configuration.socket_options = tcp_keepalive_socket_options()
+    # endif
+    return client.ApiClient(configuration)
+# enddef
+
+
+def call_class(verb):
+    if verb in ("read", "get"):
+        return "read"
+    elif verb in ("list", "watch"):
+        return verb
+    else:
+        return "write"
+    # endif
+# enddef
+
+
+class CountingApi(object):
+    def __init__(self, api, timeouts=None, retries=0):
+        self._api = api
+        # call class -> (connect, read) timeout in seconds
+        self._timeouts = timeouts or {}
+        self._retries = retries
+    # enddef
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        # endif
+        verb, _, resource = name.partition("_")
+
+        # functools.wraps keeps the docstring - kubernetes.watch.Watch reads the type of the returned objects from it
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            call_verb = "watch" if kwargs.get("watch") else verb
+            timeout = self._timeouts.get(call_class(call_verb))
+            if timeout is not None and "_request_timeout" not in kwargs:
+                kwargs["_request_timeout"] = timeout
+            # endif
+            # a watch is resumed by its informer - everything else is retried here
+            retries_left = self._retries if call_verb != "watch" else 0
+            backoff = Backoff(base_seconds=0.1, max_seconds=2)
+            while True:
+                api_calls.inc(verb=call_verb, resource=resource)
+                try:
+                    return attr(*args, **kwargs)
+                except urllib3.exceptions.HTTPError:
+                    # timeouts and connection errors - the Kubernetes-API did not answer at all
+                    api_errors.inc(verb=call_verb, resource=resource)
+                    if retries_left <= 0:
+                        raise
+                    # endif
+                    retries_left -= 1
+                    api_retries.inc(verb=call_verb, resource=resource)
+                    time.sleep(backoff.next_delay())
+                except Exception:
+                    api_errors.inc(verb=call_verb, resource=resource)
+                    raise
+                # endtry
+            # endwhile
+        # enddef
+
+        # the next lookup of this method does not end up in __getattr__ again
+        setattr(self, name, call)
+        return call
+    # enddef
+# endclass
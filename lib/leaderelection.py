@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Prerequisites
+# non-standard Python modules - kubernetes, Cplogging
+
+# Info
+# Leader election on a coordination.k8s.io Lease, like the one of client-go.
+# Every replica tries to become the holder of the lease - the leader renews it
+# every retry_period_seconds. The others take it over if it was not renewed
+# for lease_duration_seconds. Expiry is measured with the local clock from the
+# moment a replica saw the lease change, so clocks of different nodes do not
+# have to be in sync. Updates are sent with the resourceVersion that was read,
+# so only one of two replicas trying at the same time wins.
+# If the leader cannot renew the lease within renew_deadline_seconds it stops
+# being the leader and on_stopped_leading is called.
+
+# Usage
+#     from kubernetes import client
+#     from lib.leaderelection import LeaderElector
+#
+#     elector = LeaderElector(client.CoordinationV1Api(), "kube-vip-watcher", "monitoring", identity=socket.gethostname(),
+#                             on_started_leading=start_working, on_stopped_leading=stop_working)
+#     elector.start()
+#     elector.is_leader()
+
+# Changelog:
+#
+# 2026-10-17 -- initial release
+
+import datetime
+import threading
+import time
+from kubernetes import client
+from .cplogging import Cplogging
+from . import metrics
+
+is_leader_gauge = metrics.Gauge("kube_vip_watcher_leader", "1 if this replica holds the leader election lease", ["lease"])
+leader_transitions = metrics.Counter("kube_vip_watcher_leader_transitions_total", "Leader election lease acquired or lost by this replica", ["lease", "transition"])
+
+
+def now_micro_time():
+    # the Kubernetes-API expects MicroTime with exactly 6 fractional digits, but isoformat() leaves them out if they are 0
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if now.microsecond == 0:
+        now = now.replace(microsecond=1)
+    # endif
+    return now
+# enddef
+
+
+class LeaderElector(object):
+    def __init__(self, coordination_api, name, namespace, identity, lease_duration_seconds=15, renew_deadline_seconds=10, retry_period_seconds=2, on_started_leading=None, on_stopped_leading=None):
+        self.coordination_api = coordination_api
+        self.name = name
+        self.namespace = namespace
+        self.identity = identity
+        self.lease_duration_seconds = lease_duration_seconds
+        self.renew_deadline_seconds = renew_deadline_seconds
+        self.retry_period_seconds = retry_period_seconds
+        self.on_started_leading = on_started_leading
+        self.on_stopped_leading = on_stopped_leading
+
+        # we create a log handler
+        self.logger_name = str(__name__)
+        self.logger = Cplogging(self.logger_name)
+
+        self._leader = threading.Event()
+        # (holder, renewTime, leaseTransitions) of the lease as last read and the local time we saw it change
+        self._observed_record = None
+        self._observed_at = None
+        self._observed_holder = None
+    # enddef
+
+    def is_leader(self):
+        return self._leader.is_set()
+    # enddef
+
+    def _new_spec(self, lease_transitions, acquire_time):
+        return client.V1LeaseSpec(
+            holder_identity=self.identity,
+            lease_duration_seconds=int(self.lease_duration_seconds),
+            acquire_time=acquire_time,
+            renew_time=now_micro_time(),
+            lease_transitions=lease_transitions,
+        )
+    # enddef
+
+    def _try_acquire_or_renew(self):
+        # returns True if we hold the lease afterwards
+        try:
+            lease = self.coordination_api.read_namespaced_lease(self.name, self.namespace)
+        except client.rest.ApiException as e:
+            if e.status != 404:
+                raise
+            # endif
+            body = client.V1Lease(
+                metadata=client.V1ObjectMeta(name=self.name, namespace=self.namespace),
+                spec=self._new_spec(0, now_micro_time()),
+            )
+            try:
+                self.coordination_api.create_namespaced_lease(self.namespace, body)
+            except client.rest.ApiException as e:
+                if e.status == 409:
+                    # another replica created it first
+                    return False
+                # endif
+                raise
+            # endtry
+            self._observe((self.identity, body.spec.renew_time, 0))
+            return True
+        # endtry
+
+        spec = lease.spec or client.V1LeaseSpec()
+        holder = spec.holder_identity
+        lease_transitions = spec.lease_transitions or 0
+        self._observe((holder, spec.renew_time, lease_transitions))
+        self._observed_holder = holder
+
+        if holder and holder != self.identity:
+            # the lease of another replica is valid as long as we saw it renewed within its duration
+            lease_duration_seconds = spec.lease_duration_seconds or self.lease_duration_seconds
+            if time.monotonic() - self._observed_at < lease_duration_seconds:
+                return False
+            # endif
+        # endif
+
+        if holder == self.identity:
+            new_spec = self._new_spec(lease_transitions, spec.acquire_time)
+        else:
+            new_spec = self._new_spec(lease_transitions + 1, now_micro_time())
+        # endif
+        # the resourceVersion makes the update fail (409) if someone else changed the lease since we read it
+        body = client.V1Lease(
+            metadata=client.V1ObjectMeta(name=self.name, namespace=self.namespace, resource_version=lease.metadata.resource_version),
+            spec=new_spec,
+        )
+        try:
+            self.coordination_api.replace_namespaced_lease(self.name, self.namespace, body)
+        except client.rest.ApiException as e:
+            if e.status == 409:
+                return False
+            # endif
+            raise
+        # endtry
+        self._observe((self.identity, new_spec.renew_time, new_spec.lease_transitions))
+        return True
+    # enddef
+
+    def _observe(self, record):
+        if record != self._observed_record:
+            self._observed_record = record
+            self._observed_at = time.monotonic()
+        # endif
+    # enddef
+
+    def _try(self):
+        try:
+            return self._try_acquire_or_renew()
+        except Exception as e:
+            self.logger.error("Leader election %s/%s: Exception-Type: %s, Message: %s", self.namespace, self.name, type(e).__name__, e)
+            return False
+        # endtry
+    # enddef
+
+    def _acquire(self):
+        reported_holder = None
+        while not self._try():
+            if self._observed_holder != reported_holder:
+                reported_holder = self._observed_holder
+                self.logger.info("Leader election %s/%s: standing by - current leader is %s", self.namespace, self.name, reported_holder)
+            # endif
+            time.sleep(self.retry_period_seconds)
+        # endwhile
+    # enddef
+
+    def _renew(self):
+        # returns when the lease could not be renewed within renew_deadline_seconds
+        last_renewed = time.monotonic()
+        while True:
+            time.sleep(self.retry_period_seconds)
+            if self._try():
+                last_renewed = time.monotonic()
+            elif time.monotonic() - last_renewed >= self.renew_deadline_seconds:
+                return
+            # endif
+        # endwhile
+    # enddef
+
+    def run(self):
+        self._acquire()
+        self._leader.set()
+        is_leader_gauge.set(1, lease=self.name)
+        leader_transitions.inc(lease=self.name, transition="acquired")
+        self.logger.warning("Leader election %s/%s: %s is the leader now", self.namespace, self.name, self.identity)
+        if self.on_started_leading is not None:
+            # the callback must not delay renewing the lease
+            thread = threading.Thread(target=self.on_started_leading, name="leader-started")
+            thread.daemon = True
+            thread.start()
+        # endif
+
+        self._renew()
+        self._leader.clear()
+        is_leader_gauge.set(0, lease=self.name)
+        leader_transitions.inc(lease=self.name, transition="lost")
+        self.logger.error("Leader election %s/%s: %s could not renew the lease within %d seconds - not the leader anymore", self.namespace, self.name, self.identity, self.renew_deadline_seconds)
+        if self.on_stopped_leading is not None:
+            self.on_stopped_leading()
+        # endif
+    # enddef
+
+    def start(self):
+        is_leader_gauge.set(0, lease=self.name)
+        thread = threading.Thread(target=self.run, name="leader-election")
+        thread.daemon = True
+        thread.start()
+        return thread
+    # enddef
+# endclass
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Info
+# Very small, thread-safe counters, gauges and histograms. Every metric
+# registers itself by name, so all values can be collected from one place and
+# written in the Prometheus text format by exposition().
+
+# Usage
+#     from lib import metrics
+#
+#     patches = metrics.Counter("kube_vip_watcher_patches_total", "Patches sent", ["resource"])
+#     patches.inc(resource="lease")
+#     patches.value(resource="lease")
+#     metrics.collect()  # list of all registered metrics
+#
+#     latency = metrics.Histogram("kube_vip_watcher_latency_seconds", "Latency", ["path"], buckets=(0.1, 1, 10))
+#     latency.observe(0.25, path="balance")
+#
+#     metrics.exposition()  # all metrics in the Prometheus text format
+
+# Changelog:
+#
+# 2026-10-17 -- initial release
+
+import threading
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def collect():
+    with _registry_lock:
+        return list(_registry.values())
+    # endwith
+# enddef
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    # endif
+    escaped = ('%s="%s"' % (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for name, value in labels.items())
+    return "{%s}" % ",".join(escaped)
+# enddef
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    # endif
+    return repr(float(value)) if isinstance(value, float) else str(value)
+# enddef
+
+
+def exposition():
+    # the text format scraped by Prometheus - see https://prometheus.io/docs/instrumenting/exposition_formats/
+    lines = []
+    for metric in sorted(collect(), key=lambda metric: metric.name):
+        lines.append("# HELP %s %s" % (metric.name, metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")))
+        lines.append("# TYPE %s %s" % (metric.name, metric.metric_type))
+        for name, labels, value in metric.expose():
+            lines.append("%s%s %s" % (name, format_labels(labels), format_value(value)))
+        # endfor
+    # endfor
+    return "\n".join(lines) + "\n"
+# enddef
+
+
+class Metric(object):
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+        with _registry_lock:
+            if name in _registry:
+                raise ValueError("Metric %s already registered" % name)
+            # endif
+            _registry[name] = self
+        # endwith
+    # enddef
+
+    def _label_values(self, labels):
+        return tuple(str(labels.get(labelname, "")) for labelname in self.labelnames)
+    # enddef
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0)
+        # endwith
+    # enddef
+
+    def samples(self):
+        # list of (dict of labels, value)
+        with self._lock:
+            return [(dict(zip(self.labelnames, label_values)), value) for label_values, value in self._values.items()]
+        # endwith
+    # enddef
+
+    def expose(self):
+        # list of (sample name, dict of labels, value) as written by exposition()
+        return [(self.name, labels, value) for labels, value in self.samples()]
+    # enddef
+# endclass
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        # endwith
+    # enddef
+# endclass
+
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+        # endwith
+    # enddef
+
+    def inc(self, amount=1, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        # endwith
+    # enddef
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+    # enddef
+# endclass
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+    # seconds - from a few milliseconds for a decision made from the stores up to a slow failover
+    default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=default_buckets):
+        Metric.__init__(self, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    # enddef
+
+    def observe(self, value, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            # per label-set: [count per bucket (not cumulative), sum, count]
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            # endif
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    state[0][index] += 1
+                    break
+                # endif
+            # endfor
+            state[1] += value
+            state[2] += 1
+        # endwith
+    # enddef
+
+    def value(self, **labels):
+        # the number of observations
+        with self._lock:
+            state = self._values.get(self._label_values(labels))
+            return state[2] if state is not None else 0
+        # endwith
+    # enddef
+
+    def samples(self):
+        # list of (dict of labels, (cumulative count per bucket, sum, count))
+        samples = []
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in self._values.items():
+                cumulative = []
+                running = 0
+                for bucket_count in bucket_counts:
+                    running += bucket_count
+                    cumulative.append(running)
+                # endfor
+                samples.append((dict(zip(self.labelnames, label_values)), (cumulative, total, count)))
+            # endfor
+        # endwith
+        return samples
+    # enddef
+
+    def expose(self):
+        exposed = []
+        for labels, (cumulative, total, count) in self.samples():
+            for upper_bound, bucket_count in zip(self.buckets + (float("inf"),), cumulative + [count]):
+                exposed.append((self.name + "_bucket", dict(labels, le=format_value(float(upper_bound))), bucket_count))
+            # endfor
+            exposed.append((self.name + "_sum", labels, total))
+            exposed.append((self.name + "_count", labels, count))
+        # endfor
+        return exposed
+    # enddef
+# endclass
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Info
+# Compact records of Kubernetes objects as kept in the stores of the watcher -
+# only the fields the balance-decisions need, e.g. the readiness of a node or of
+# the containers of a pod as precomputed boolean. Records only have __slots__
+# (no __dict__ per object) and values repeating across many objects - namespaces,
+# node names, label values - are interned, so every distinct value is kept once.
+# The memory per object therefore only grows with its own names.
+# A record is either built from a model object of the kubernetes-client
+# (parse_*) or straight from the JSON as sent by the Kubernetes-API (decode_*),
+# which skips building the model object.
+# "python benchmarks/records_benchmark.py" measures the bytes per pod.
+
+# Usage
+#     from lib.informer import Informer
+#     from lib.records import decode_pod_descriptor
+#
+#     pod_informer = Informer("pods", v1_core.list_pod_for_all_namespaces, decode=decode_pod_descriptor)
+
+# Changelog:
+#
+# 2026-10-17 -- initial release
+
+import sys
+
+
+class Record(object):
+    __slots__ = ()
+    # fields holding values which repeat across many objects
+    interned = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            value = fields.pop(name, None)
+            if value is not None and name in self.interned:
+                value = sys.intern(value)
+            # endif
+            setattr(self, name, value)
+        # endfor
+        if fields:
+            raise TypeError("%s got unexpected fields: %s" % (type(self).__name__, ", ".join(sorted(fields))))
+        # endif
+    # enddef
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__, ", ".join("%s=%r" % (name, getattr(self, name)) for name in self.__slots__))
+    # enddef
+# endclass
+
+
+class PodDescriptor(Record):
+    __slots__ = (
+        "namespace",
+        "name",
+        "resource_version",
+        "app",               # app-label or None
+        "balance_ip",        # annotation 'kubeVipBalanceIP' or None
+        "node_name",
+        "phase",
+        "containers_ready",  # True if the pod has container statuses and all containers are ready
+    )
+    interned = ("namespace", "app", "balance_ip", "node_name", "phase")
+# endclass
+
+
+class ServiceDescriptor(Record):
+    # everything balance() needs from a service - parsed once per resourceVersion when the service is stored
+    __slots__ = (
+        "namespace",
+        "name",
+        "resource_version",
+        "app",                     # app-label or None
+        "balance_priority_order",  # tuple of (interned) node names from annotation 'kubeVipBalancePriority' or None
+        "vips",                    # tuple of VIPs
+        "traffic_policy",
+        "vip_host",                # annotation 'kube-vip.io/vipHost' or None
+    )
+    interned = ("namespace", "app", "traffic_policy", "vip_host")
+# endclass
+
+
+class NodeDescriptor(Record):
+    __slots__ = (
+        "name",
+        "resource_version",
+        "ready",        # status of the "Ready"-condition as boolean - None if the node has no such condition
+        "ready_since",  # lastTransitionTime of the "Ready"-condition
+    )
+    interned = ("name",)
+# endclass
+
+
+class LeaseDescriptor(Record):
+    __slots__ = (
+        "namespace",
+        "name",
+        "resource_version",
+        "holder_identity",
+    )
+    interned = ("namespace", "holder_identity")
+# endclass
+
+
+def parse_pod_descriptor(pod):
+    # from a V1Pod
+    labels = pod.metadata.labels or {}
+    annotations = pod.metadata.annotations or {}
+    container_statuses = pod.status.container_statuses if pod.status is not None else None
+    return PodDescriptor(
+        namespace=pod.metadata.namespace,
+        name=pod.metadata.name,
+        resource_version=pod.metadata.resource_version,
+        app=labels.get('app'),
+        balance_ip=annotations.get('kubeVipBalanceIP'),
+        node_name=pod.spec.node_name if pod.spec is not None else None,
+        phase=pod.status.phase if pod.status is not None else None,
+        containers_ready=container_statuses is not None and all(container_status.ready for container_status in container_statuses),
+    )
+# enddef
+
+
+def decode_pod_descriptor(pod):
+    # from the JSON of a pod - e.g. a list- or watch-response read with _preload_content=False
+    metadata = pod['metadata']
+    labels = metadata.get('labels') or {}
+    annotations = metadata.get('annotations') or {}
+    spec = pod.get('spec') or {}
+    status = pod.get('status') or {}
+    container_statuses = status.get('containerStatuses')
+    return PodDescriptor(
+        namespace=metadata.get('namespace'),
+        name=metadata['name'],
+        resource_version=metadata.get('resourceVersion'),
+        app=labels.get('app'),
+        balance_ip=annotations.get('kubeVipBalanceIP'),
+        node_name=spec.get('nodeName'),
+        phase=status.get('phase'),
+        containers_ready=container_statuses is not None and all(container_status.get('ready') for container_status in container_statuses),
+    )
+# enddef
+
+
+def intern_tuple(values):
+    # e.g. the node names of 'kubeVipBalancePriority' - the same few names appear in many services
+    return tuple(sys.intern(value) for value in values)
+# enddef
+
+
+def parse_node_descriptor(node):
+    # from a V1Node
+    conditions = node.status.conditions if node.status is not None else None
+    condition = next((condition for condition in conditions or () if condition.type == "Ready"), None)
+    return NodeDescriptor(
+        name=node.metadata.name,
+        resource_version=node.metadata.resource_version,
+        ready=condition.status == "True" if condition is not None else None,
+        ready_since=condition.last_transition_time if condition is not None else None,
+    )
+# enddef
+
+
+def parse_lease_descriptor(lease):
+    # from a V1Lease
+    return LeaseDescriptor(
+        namespace=lease.metadata.namespace,
+        name=lease.metadata.name,
+        resource_version=lease.metadata.resource_version,
+        holder_identity=lease.spec.holder_identity if lease.spec is not None else None,
+    )
+# enddef
@@ -1,7 +1,6 @@
 import __main__
 import os
 import socket
-import json
 
 # we get the filename from the main calling script
 # ATTENTION: if you override this in your main program/script, you also have to override
@@ -18,22 +17,10 @@ global_log_format_type = "json"
 if global_log_format_type == "string":
     global_set_log_format = "%(asctime)s " + socket.gethostname() + " " + global_process_name + "[%(process)d]: MODULE: %(name)s LEVEL: %(levelname)s MESSAGE: %(message)s"
 else:
-    global_set_log_format = {
-        "@timstamp": "%(asctime)s",
-        "host": {
-            "name": socket.gethostname()
-        },
-        "process": {
-            "name": global_process_name,
-            "id": "%(process)d",
-            "module": "%(name)s"
-        },
-        "log": {
-            "level": "%(levelname)s"
-        },
-        "message": "%(message)s"
-    }
-    global_set_log_format = json.dumps(global_set_log_format)
+    # "json" makes cplogging write every record as one "Elastic Common Schema" compatible JSON-object:
+    # {"@timstamp": ..., "host": {"name": ...}, "process": {"name": ..., "id": ..., "module": ...}, "log": {"level": ...}, "message": ...}
+    # the log context (namespace, service, node, ...) is added as top-level keys
+    global_set_log_format = "json"
 # endif
 
 # the log format shown on the console
@@ -55,3 +42,89 @@ global_log_server = ("127.0.0.1", 1514)  # IP/FQDN and port (UDP)
 # the log format for syslog messages
 # global_log_server_format = "%(asctime)s " + socket.gethostname() + " " + global_process_name + "[%(process)d]: MODULE: %(name)s LEVEL: %(levelname)s MESSAGE: %(message)s"
 global_log_server_format = global_set_log_format
+
+# log records are handed to the handlers (console, file, syslog) by a background thread in batches, so writing logs
+# never delays the calling thread - set to False to call the handlers directly
+global_log_queue_enable = True
+# maximum number of log records waiting to be written (0 = unlimited)
+global_log_queue_size = 10000
+# what happens if the queue is full: "drop-oldest" drops the oldest waiting record (and counts it), "block" waits for free space
+global_log_queue_overflow = "drop-oldest"
+
+# settings for the watcher itself
+# only watch pods with this label, so the Kubernetes-API does the filtering - e.g. "kube-vip-watcher/balance=true"
+# None watches all pods and only the ones with annotation "kubeVipBalanceIP" are used
+global_watch_pod_label_selector = None
+# only watch pods and services in these namespaces - an empty list watches all namespaces
+global_watch_namespaces = []
+# pod events for the same service arriving within this many seconds are collapsed into one balance-run
+global_balance_debounce_seconds = 0.5
+# number of worker threads balancing different services in parallel - events of one service are always handled in order
+global_balance_workers = 4
+# maximum number of services waiting to be balanced - if reached, processing of further pod events waits (0 = unlimited)
+global_balance_queue_depth = 1000
+# when a node leaves "Ready", the patches for all VIPs held by it are sent concurrently by this many threads
+global_failover_workers = 16
+# the startup reconcile balances every service once with this many threads - their patches overlap like the failover's do
+global_startup_reconcile_workers = 16
+# log an error if moving all VIPs of a node takes longer than this
+global_failover_timeout_seconds = 10
+# port of the HTTP-server for the Prometheus metrics on /metrics and the probes on /healthz and /readyz
+global_http_port = 8080
+# /healthz fails if a watch got neither an event nor a bookmark for this many seconds - the Kubernetes-API sends a bookmark about every minute
+global_liveness_watch_silence_seconds = 300
+# only one replica (the holder of this lease) balances and patches - the others keep their stores up to date and take over
+# within lease_duration_seconds if the leader is gone. False lets every replica balance (only run one then!)
+global_leader_election_enable = False
+global_leader_election_lease_name = "kube-vip-watcher"
+# namespace of the lease - None uses the namespace the watcher is running in
+global_leader_election_namespace = None
+# a standby replica takes over if the lease was not renewed for this many seconds
+global_leader_election_lease_duration_seconds = 15
+# the leader gives up (and restarts) if it could not renew the lease for this many seconds - must be less than the lease duration
+global_leader_election_renew_deadline_seconds = 10
+# how often the leader renews the lease and the standby replicas check it
+global_leader_election_retry_period_seconds = 2
+# instead of one leader, every replica balances the namespaces it owns - the namespaces (the allowlist or all namespaces)
+# are split between the replicas by consistent hashing. Replaces the leader election if enabled
+global_sharding_enable = False
+# every replica holds a lease "<group>-<pod-name>" in the namespace of the watcher (or global_sharding_namespace)
+global_sharding_group = "kube-vip-watcher-shard"
+global_sharding_namespace = None
+# a replica is gone if its lease was not renewed for this many seconds - its namespaces are taken over by the others
+global_sharding_lease_duration_seconds = 15
+# how often a replica renews its lease and checks the leases of the others
+global_sharding_renew_period_seconds = 5
+# points per replica on the hash ring - more points split the namespaces more evenly
+global_sharding_virtual_nodes = 64
+# a failed or too short pod-watch is retried after a random delay between 0 and base * 2^failures, at most max seconds -
+# the stores are kept, so the watch resumes where it stopped
+global_reconnect_backoff_base_seconds = 0.5
+global_reconnect_backoff_max_seconds = 60
+# after this many failures in sequence no reconnect is tried for open_seconds - then one try decides if it stays paused
+global_reconnect_breaker_failures = 5
+global_reconnect_breaker_open_seconds = 120
+# connections to the Kubernetes-API shared by all threads - every running watch holds one, the balance and failover workers
+# need one each while they patch. More threads than connections still works, but the extra connections are not reused
+global_api_connection_pool_size = 32
+# TCP keep-alive probes notice dead connections of long-running watches
+global_api_tcp_keepalive = True
+# timeouts in seconds per call class - a call failing on the connection (e.g. a timeout) is retried global_api_retries times
+global_api_connect_timeout_seconds = 5
+global_api_read_timeout_seconds = 10
+global_api_list_timeout_seconds = 60
+global_api_write_timeout_seconds = 10
+# a watch gets at least a bookmark about every minute - no data for this long means the connection is dead
+global_api_watch_read_timeout_seconds = 300
+global_api_retries = 2
+# pods are read as plain JSON from the list- and watch-responses and only the needed fields are kept - False builds
+# the V1Pod objects of the kubernetes-client first (more CPU per event and memory while listing)
+global_watch_pods_slim = True
+# up to this many namespaces of global_watch_namespaces or of a shard are watched on their own (a connection and a thread
+# each for pods, services and leases) - with more one cluster-wide watch is used per store and the other namespaces are
+# dropped by the watcher (0 = no limit)
+global_watch_max_namespace_watches = 64
+# a service whose lease holder is changed back by kube-vip is balanced again after a delay doubling from base up to
+# max with every further change (jittered between half and all of it) - back at base once the holder stayed put for max seconds
+global_lease_flip_backoff_base_seconds = 1
+global_lease_flip_backoff_max_seconds = 300
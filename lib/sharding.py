@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Prerequisites
+# non-standard Python modules - kubernetes, Cplogging
+
+# Info
+# Splits work between several replicas with consistent hashing. Every replica
+# holds its own membership Lease "<group>-<identity>" (labeled with the group)
+# and renews it every renew_period_seconds. All replicas list the leases of the
+# group - a member is alive as long as we saw its lease renewed within
+# lease_duration_seconds (measured with the local clock like the leader
+# election, so clocks do not have to be in sync).
+# The alive members are put on a hash ring with virtual_nodes points each, so a
+# key (e.g. a namespace) belongs to exactly one member and a member joining or
+# leaving only moves about 1/n of the keys. on_members_changed(members) is
+# called whenever the alive members change - also once after the first listing.
+# It runs in a thread of its own, so a slow callback never delays the renewal
+# of our lease - changes while it runs are collapsed into one more call.
+# A replica which could not renew its own lease for most of lease_duration_seconds
+# owns nothing until it can again, so two replicas only own the same key for the
+# moment it takes the others to notice a change.
+
+# Usage
+#     from kubernetes import client
+#     from lib.sharding import ShardMembership
+#
+#     membership = ShardMembership(client.CoordinationV1Api(), "kube-vip-watcher", "monitoring", identity=socket.gethostname(),
+#                                  on_members_changed=rebalance)
+#     membership.start()
+#     membership.wait_for_members()
+#     membership.owns("logging")
+
+# Changelog:
+#
+# 2026-10-17 -- initial release
+
+import bisect
+import hashlib
+import threading
+import time
+from kubernetes import client
+from .cplogging import Cplogging
+from .leaderelection import now_micro_time
+from . import metrics
+
+shard_members = metrics.Gauge("kube_vip_watcher_shard_members", "Alive members of the shard group as seen by this replica", ["group"])
+shard_rebalances = metrics.Counter("kube_vip_watcher_shard_rebalances_total", "Changes of the alive members of the shard group", ["group"])
+
+GROUP_LABEL = "kube-vip-watcher/shard-group"
+
+
+def hash_key(key):
+    # md5 is only used for its even distribution - it is stable across processes unlike hash()
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:16], 16)
+# enddef
+
+
+class ShardRing(object):
+    def __init__(self, members, virtual_nodes=64):
+        self.members = sorted(members)
+        points = []
+        for member in self.members:
+            for i in range(virtual_nodes):
+                points.append((hash_key("%s#%d" % (member, i)), member))
+            # endfor
+        # endfor
+        points.sort()
+        self._hashes = [point[0] for point in points]
+        self._members = [point[1] for point in points]
+    # enddef
+
+    def owner(self, key):
+        # the first point on the ring at or after the hash of the key - None if there are no members
+        if not self._hashes:
+            return None
+        # endif
+        i = bisect.bisect_left(self._hashes, hash_key(key))
+        if i == len(self._hashes):
+            i = 0
+        # endif
+        return self._members[i]
+    # enddef
+# endclass
+
+
+class ShardMembership(object):
+    def __init__(self, coordination_api, group, namespace, identity, lease_duration_seconds=15, renew_period_seconds=5, virtual_nodes=64, on_members_changed=None):
+        self.coordination_api = coordination_api
+        self.group = group
+        self.namespace = namespace
+        self.identity = identity
+        self.lease_name = "%s-%s" % (group, identity)
+        self.lease_duration_seconds = lease_duration_seconds
+        self.renew_period_seconds = renew_period_seconds
+        self.virtual_nodes = virtual_nodes
+        self.on_members_changed = on_members_changed
+
+        # we create a log handler
+        self.logger_name = str(__name__)
+        self.logger = Cplogging(self.logger_name)
+
+        self.ring = ShardRing([], virtual_nodes)
+        self._has_members = threading.Event()
+        self._members_changed = threading.Event()
+        self._last_renewed = None
+        # lease name -> (holder, renewTime) as last read and the local time we saw it change
+        self._observed = {}
+    # enddef
+
+    def members(self):
+        return list(self.ring.members)
+    # enddef
+
+    def owns(self, key):
+        return self.ring.owner(key) == self.identity
+    # enddef
+
+    def wait_for_members(self, timeout=None):
+        return self._has_members.wait(timeout)
+    # enddef
+
+    def _renew(self):
+        spec = client.V1LeaseSpec(
+            holder_identity=self.identity,
+            lease_duration_seconds=int(self.lease_duration_seconds),
+            renew_time=now_micro_time(),
+        )
+        try:
+            # nobody else writes our lease, so no resourceVersion is needed
+            self.coordination_api.patch_namespaced_lease(self.lease_name, self.namespace, client.V1Lease(spec=spec))
+        except client.rest.ApiException as e:
+            if e.status != 404:
+                raise
+            # endif
+            body = client.V1Lease(
+                metadata=client.V1ObjectMeta(name=self.lease_name, namespace=self.namespace, labels={GROUP_LABEL: self.group}),
+                spec=spec,
+            )
+            self.coordination_api.create_namespaced_lease(self.namespace, body)
+        # endtry
+        self._last_renewed = time.monotonic()
+    # enddef
+
+    def _delete_lease(self, name):
+        try:
+            self.coordination_api.delete_namespaced_lease(name, self.namespace)
+            self.logger.info("Sharding %s: removed expired lease %s/%s", self.group, self.namespace, name)
+        except client.rest.ApiException as e:
+            if e.status != 404:
+                self.logger.warning("Sharding %s: could not remove expired lease %s/%s - Exception-Type: %s, Message: %s", self.group, self.namespace, name, type(e).__name__, e)
+            # endif
+        # endtry
+    # enddef
+
+    def _alive_members(self):
+        leases = self.coordination_api.list_namespaced_lease(self.namespace, label_selector="%s=%s" % (GROUP_LABEL, self.group)).items
+        now = time.monotonic()
+        alive = set()
+        observed = {}
+        for lease in leases:
+            spec = lease.spec or client.V1LeaseSpec()
+            if not spec.holder_identity:
+                continue
+            # endif
+            record = (spec.holder_identity, spec.renew_time)
+            previous = self._observed.get(lease.metadata.name)
+            if previous is not None and previous[0] == record:
+                observed_at = previous[1]
+            else:
+                # a lease we see for the first time is alive until it was not renewed for its duration
+                observed_at = now
+            # endif
+            observed[lease.metadata.name] = (record, observed_at)
+            lease_duration_seconds = spec.lease_duration_seconds or self.lease_duration_seconds
+            if spec.holder_identity == self.identity:
+                continue
+            elif now - observed_at < lease_duration_seconds:
+                alive.add(spec.holder_identity)
+            elif now - observed_at > 4 * lease_duration_seconds:
+                # every replica has a new identity after a restart - leases of replicas long gone are removed
+                self._delete_lease(lease.metadata.name)
+            # endif
+        # endfor
+        self._observed = observed
+
+        # we only count ourselves if the others cannot have given up on us yet
+        if self._last_renewed is not None and now - self._last_renewed < self.lease_duration_seconds - self.renew_period_seconds:
+            alive.add(self.identity)
+        # endif
+        return alive
+    # enddef
+
+    def _update(self):
+        try:
+            self._renew()
+        except Exception as e:
+            self.logger.error("Sharding %s: could not renew lease %s/%s - Exception-Type: %s, Message: %s", self.group, self.namespace, self.lease_name, type(e).__name__, e)
+        # endtry
+        try:
+            members = self._alive_members()
+        except Exception as e:
+            self.logger.error("Sharding %s: could not list the members - Exception-Type: %s, Message: %s", self.group, type(e).__name__, e)
+            if self._last_renewed is None or time.monotonic() - self._last_renewed < self.lease_duration_seconds - self.renew_period_seconds:
+                return
+            # endif
+            # without our own lease renewed the others already took over our keys
+            members = set()
+        # endtry
+
+        if self._has_members.is_set() and members == set(self.ring.members):
+            return
+        # endif
+        self.ring = ShardRing(members, self.virtual_nodes)
+        shard_members.set(len(members), group=self.group)
+        shard_rebalances.inc(group=self.group)
+        self.logger.warning("Sharding %s: %d members - %s", self.group, len(members), ", ".join(sorted(members)) or "<none>")
+        self._has_members.set()
+        self._members_changed.set()
+    # enddef
+
+    def _notify(self):
+        while True:
+            self._members_changed.wait()
+            self._members_changed.clear()
+            if self.on_members_changed is None:
+                continue
+            # endif
+            try:
+                self.on_members_changed(self.members())
+            except Exception as e:
+                self.logger.error("Sharding %s: on_members_changed failed - Exception-Type: %s, Message: %s", self.group, type(e).__name__, e)
+            # endtry
+        # endwhile
+    # enddef
+
+    def run(self):
+        while True:
+            self._update()
+            time.sleep(self.renew_period_seconds)
+        # endwhile
+    # enddef
+
+    def start(self):
+        notifier = threading.Thread(target=self._notify, name="sharding-members-changed")
+        notifier.daemon = True
+        notifier.start()
+        thread = threading.Thread(target=self.run, name="sharding")
+        thread.daemon = True
+        thread.start()
+        return thread
+    # enddef
+# endclass
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Info
+# A keyed work queue with deduplication and debounce. Everything added for the
+# same key while the key is waiting is collapsed into one work item, and a key
+# is only handed out after the debounce window (counted from the first add)
+# has passed. A key that is currently being processed is not handed out a
+# second time - new work for it waits until done() is called, so the work for
+# one key is always processed in order. This makes it possible to use several
+# worker threads on one queue - different keys are processed in parallel.
+# With maxsize set, add() blocks while that many keys are already waiting.
+# add() can also hold a new key back longer than the debounce window
+# (delay_seconds) - e.g. to rate-limit work for a key.
+# Work for a key done outside of the workers claims the key first - claim()
+# waits until no worker processes it and keeps get() from handing it out until
+# done() is called.
+
+# Usage
+#     from lib.workqueue import WorkQueue
+#
+#     balance_queue = WorkQueue("balance", debounce_seconds=0.5, maxsize=1000)
+#     # producer
+#     balance_queue.add(("default", "echoserver"), value, merge=lambda old, new: new)
+#     # consumer
+#     key, value = balance_queue.get()
+#     try:
+#         do_something(key, value)
+#     finally:
+#         balance_queue.done(key)
+#     # elsewhere
+#     balance_queue.claim(("default", "echoserver"))
+#     try:
+#         do_something_else()
+#     finally:
+#         balance_queue.done(("default", "echoserver"))
+
+# Changelog:
+#
+# 2026-10-17 -- initial release
+
+import threading
+import time
+from . import metrics
+
+events_coalesced = metrics.Counter("kube_vip_watcher_workqueue_coalesced_total", "Work items collapsed into an already waiting item of the same key", ["queue"])
+queue_depth = metrics.Gauge("kube_vip_watcher_workqueue_depth", "Keys waiting to be processed", ["queue"])
+
+
+class WorkQueue(object):
+    def __init__(self, name, debounce_seconds=0.0, maxsize=0):
+        self.name = name
+        self.debounce_seconds = debounce_seconds
+        # 0 means unlimited
+        self.maxsize = maxsize
+
+        self._cond = threading.Condition()
+        # key -> value and key -> time the key may be handed out - both in the order the keys were added
+        self._pending = {}
+        self._ready_at = {}
+        self._processing = set()
+    # enddef
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending)
+        # endwith
+    # enddef
+
+    def add(self, key, value, merge=None, delay_seconds=0.0):
+        with self._cond:
+            # a new key has to wait for free space - work for a key which is already waiting is always accepted
+            while key not in self._pending and self.maxsize > 0 and len(self._pending) >= self.maxsize:
+                self._cond.wait()
+            # endwhile
+
+            if key in self._pending:
+                if merge is None:
+                    self._pending[key] = value
+                else:
+                    self._pending[key] = merge(self._pending[key], value)
+                # endif
+                events_coalesced.inc(queue=self.name)
+            else:
+                self._pending[key] = value
+                # a key which is already waiting keeps its time - the delay only holds back new work
+                self._ready_at[key] = time.monotonic() + max(self.debounce_seconds, delay_seconds)
+                queue_depth.set(len(self._pending), queue=self.name)
+                self._cond.notify_all()
+            # endif
+        # endwith
+    # enddef
+
+    def get(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                next_ready_at = None
+                for key, ready_at in self._ready_at.items():
+                    if key in self._processing:
+                        continue
+                    # endif
+                    if ready_at <= now:
+                        value = self._pending.pop(key)
+                        del self._ready_at[key]
+                        self._processing.add(key)
+                        queue_depth.set(len(self._pending), queue=self.name)
+                        # wake up producers waiting for free space
+                        self._cond.notify_all()
+                        return key, value
+                    # endif
+                    if next_ready_at is None or ready_at < next_ready_at:
+                        next_ready_at = ready_at
+                    # endif
+                # endfor
+
+                if next_ready_at is None:
+                    self._cond.wait()
+                else:
+                    self._cond.wait(next_ready_at - now)
+                # endif
+            # endwhile
+        # endwith
+    # enddef
+
+    def claim(self, key):
+        # work already waiting for the key stays queued and is handed out after done()
+        with self._cond:
+            while key in self._processing:
+                self._cond.wait()
+            # endwhile
+            self._processing.add(key)
+        # endwith
+    # enddef
+
+    def done(self, key):
+        with self._cond:
+            self._processing.discard(key)
+            self._cond.notify_all()
+        # endwith
+    # enddef
+# endclass